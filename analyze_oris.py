@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Analyse statique des enchaînements .oris (générés ou écrits à la main).
+
+Chaque fichier est découpé en étapes (séparateur « & » de premier niveau) :
+  • fwpa(=ftxt(nom=)& fsdk_…(…))   → étape qui produit la variable `nom`
+  • fsdk_read / fsdk_param / fsdk_write / fsdk_new / freq(…)
+  • &fpar("nom")                    → sortie de la variable `nom`
+Une étape dépend d’une autre quand elle lit (`$fpar("x")`, `fpar(x)`) la
+variable que l’autre produit ; les variables sans producteur viennent de la
+requête HTTP. Une écriture (fsdk_write, fsdk_new) ordonne aussi les étapes
+sur la même table : elle attend celles qui la précèdent, et celles qui la
+suivent l’attendent.
+
+Rapport par endpoint :
+  • nombre de parcours de table côté serveur (read, param, write, freq)
+  • lectures d’une même base qui pourraient être fusionnées
+  • niveaux d’exécution : étapes indépendantes exécutables en parallèle
+  • lectures plein masque (`*` : toutes les colonnes de la table)
+
+Exemples :
+    python analyze_oris.py                      # tout sdk/**
+    python analyze_oris.py sdk/agents --json
+"""
+
+import argparse, json, re
+from pathlib import Path
+
+from create_scripts import SCHEMA, SDK_DIR, load_schema
+
+SCAN_KINDS = {"fsdk_read", "fsdk_param", "fsdk_write", "freq"}
+READ_KINDS = {"fsdk_read", "fsdk_param"}
+WRITE_KINDS = {"fsdk_write", "fsdk_new"}
+
+_COMMENT = re.compile(r"<!--.*?--!?>", re.S)
+_CALL    = re.compile(r"\b(fsdk_read|fsdk_param|fsdk_write|fsdk_new|freq)\s*\(")
+_PRODUCE = re.compile(r"^\s*fwpa\s*\(\s*=?\s*(?:ftxt\(\s*([\w.-]+)\s*=\s*\)|\"\s*([\w.-]+)\s*=)")
+_OUTPUT  = re.compile(r'^\s*fpar\(\s*"?([\w.-]+)"?\s*\)\s*$', re.S)
+_FPAR    = re.compile(r'fpar\(\s*"?([\w.-]+)"?\s*\)')
+_FILTER  = re.compile(r"[&\"?]fil(\d+)=")
+_INI     = re.compile(r"[\w./-]+\.ini")
+_NOT_FILTER = re.compile(r"\s+|json=true&?")
+
+# ───────────────────────────── découpage ─────────────────────────────────────
+def split_top_level(text: str, sep: str = "&", depth0: int = 0) -> list:
+    """Découpe `text` sur `sep` hors parenthèses et hors guillemets."""
+    parts, depth, quoted, start = [], depth0, False, 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == sep and depth == depth0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+def call_args(text: str, open_paren: int):
+    """Arguments (texte brut) de l’appel dont la « ( » est en `open_paren`."""
+    depth, quoted = 0, False
+    for i in range(open_paren, len(text)):
+        ch = text[i]
+        if ch == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return [a.strip() for a in split_top_level(text[open_paren + 1:i], ",")]
+    return [a.strip() for a in split_top_level(text[open_paren + 1:], ",")]
+
+class Step:
+    """Une étape d’un enchaînement .oris."""
+    def __init__(self, index: int, text: str):
+        self.index = index
+        self.text = text.strip()
+        self.kind = "other"
+        self.output = None      # variable produite (fwpa)
+        self.path = None        # .ini de la table visée
+        self.mask = None        # liste d’indices de colonnes (read) / colonne (param)
+        self.params = ""        # dernier argument brut (filtres, mch…)
+        self.filters = []       # indices des colonnes filtrées
+        self.filter_text = ""   # filtres (opérateurs et valeurs), normalisés
+        self.depends = set()    # étapes dont celle-ci dépend (indices)
+
+        m = _OUTPUT.match(self.text)
+        if m:
+            self.kind, self.consumes = "output", {m.group(1)}
+            return
+        m = _PRODUCE.match(self.text)
+        if m:
+            self.output = m.group(1) or m.group(2)
+        call = _CALL.search(self.text)
+        if call:
+            self.kind = call.group(1)
+            args = call_args(self.text, call.end() - 1)
+            if self.kind == "freq":
+                ini = _INI.search(self.text[call.end():])
+                self.path = ini.group(0) if ini else None
+                self.params = self.text[call.end():]
+            else:
+                self.path = args[0] if args else None
+                if self.kind == "fsdk_param" and len(args) > 2:
+                    self.mask = [int(c) for c in re.findall(r"\d+", args[2])]
+                elif len(args) > 1:
+                    self.mask = [int(c) for c in re.findall(r"\d+", args[1])]
+                self.params = args[-1] if len(args) > 2 else ""
+            self.filters = sorted({int(c) for c in _FILTER.findall(self.params)})
+            self.filter_text = _NOT_FILTER.sub("", self.params) if self.filters else ""
+        elif self.output:
+            self.kind = "const"
+        self.consumes = set(_FPAR.findall(self.text))
+        if self.output:
+            self.consumes.discard(self.output)
+
+    @property
+    def scans(self) -> bool:
+        return self.kind in SCAN_KINDS
+
+def parse_oris(text: str) -> list:
+    """Texte .oris → liste d’étapes, dépendances résolues."""
+    text = _COMMENT.sub("", text).strip()
+    if text.startswith("="):
+        text = text[1:]
+    steps = [Step(n, part) for n, part in enumerate(p for p in split_top_level(text) if p.strip())]
+    producers, on_path = {}, {}
+    for step in steps:
+        step.depends = {producers[v] for v in step.consumes if v in producers}
+        if step.output:
+            producers[step.output] = step.index
+        if step.path:
+            # étapes de la table depuis sa dernière écriture (celle-ci en tête)
+            since = on_path.setdefault(step.path, [])
+            if step.kind in WRITE_KINDS:
+                step.depends.update(since)
+                on_path[step.path] = [step.index]
+            elif since and steps[since[0]].kind in WRITE_KINDS:
+                step.depends.add(since[0])
+                since.append(step.index)
+            else:
+                since.append(step.index)
+    return steps
+
+def levels(steps: list) -> list:
+    """Niveaux d’exécution : une étape ne dépend que d’étapes de niveaux antérieurs."""
+    level = {}
+    for step in steps:
+        level[step.index] = 1 + max((level[d] for d in step.depends), default=-1)
+    out = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for step in steps:
+        out[level[step.index]].append(step)
+    return out
+
+# ───────────────────────────── analyse ───────────────────────────────────────
+def analyze(path: Path, widths: dict) -> dict:
+    steps = parse_oris(path.read_text(encoding="utf-8", errors="replace"))
+    scans = [s for s in steps if s.scans]
+
+    # lectures d’une même base, sans écriture de cette base entre elles
+    same_base, writes = {}, {}
+    for s in steps:
+        if s.kind in WRITE_KINDS and s.path:
+            writes[s.path] = writes.get(s.path, 0) + 1
+        elif s.kind in READ_KINDS and s.path:
+            same_base.setdefault((s.path, writes.get(s.path, 0)), []).append(s)
+    mergeable = [
+        {"path": p, "steps": [s.index for s in group],
+         "same_filters": len({s.filter_text for s in group}) == 1}
+        for (p, _), group in same_base.items() if len(group) > 1
+    ]
+
+    parallel = [[s.index for s in lvl if s.scans] for lvl in levels(steps)]
+    parallel = [lvl for lvl in parallel if len(lvl) > 1]
+
+    full_reads = [
+        s.index for s in steps
+        if s.kind == "fsdk_read" and s.mask is not None and s.path in widths
+        and set(s.mask) >= set(range(widths[s.path]))
+    ]
+
+    inputs = sorted({v for s in steps for v in s.consumes} - {s.output for s in steps if s.output})
+    return {
+        "file": str(path),
+        "steps": len(steps),
+        "table_scans": len(scans),
+        "inputs": inputs,
+        "mergeable_reads": mergeable,
+        "parallel_levels": parallel,
+        "full_column_reads": full_reads,
+        "chain": [
+            {"step": s.index, "kind": s.kind, "output": s.output, "path": s.path,
+             "filters": s.filters, "depends": sorted(s.depends)}
+            for s in steps
+        ],
+    }
+
+def print_report(res: dict):
+    print(f"{res['file']}: {res['table_scans']} parcours de table, {res['steps']} étape(s)"
+          + (f", entrées {', '.join(res['inputs'])}" if res["inputs"] else ""))
+    for m in res["mergeable_reads"]:
+        how = "mêmes filtres" if m["same_filters"] else "filtres différents"
+        print(f"  ↔ lectures fusionnables sur {m['path']} : étapes {m['steps']} ({how})")
+    for lvl in res["parallel_levels"]:
+        print(f"  ∥ étapes indépendantes (parallélisables) : {lvl}")
+    for idx in res["full_column_reads"]:
+        print(f"  ★ étape {idx} : lecture de toutes les colonnes")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse statique des .oris")
+    parser.add_argument("paths", nargs="*", type=Path, default=[SDK_DIR])
+    parser.add_argument("--schema", type=Path, default=SCHEMA)
+    parser.add_argument("--json", action="store_true", help="rapport JSON (une ligne par fichier)")
+    args = parser.parse_args(argv)
+
+    widths = {t.path: len(t.fields) for t in load_schema(args.schema).tables.values()}
+    files = sorted(f for p in args.paths for f in ([p] if p.is_file() else p.rglob("*.oris")))
+    total = 0
+    for f in files:
+        res = analyze(f, widths)
+        total += res["table_scans"]
+        if args.json:
+            print(json.dumps(res, ensure_ascii=False))
+        else:
+            print_report(res)
+    if not args.json:
+        print(f"\n{len(files)} fichier(s), {total} parcours de table au total.")
+
+if __name__ == "__main__":
+    main()
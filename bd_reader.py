@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Lecture locale des fichiers de données bd/*.000 (sans passer par l’API REST).
+
+Format d’un fichier .000 (latin-1, fins de ligne CRLF) :
+    <compteur>             prochain id attribué (max id + 1)
+    1                      second en-tête (non interprété)
+    §<id>§#0_<val>#1_<val>#...#<n>_<val>#
+    §<id>§#0_<val>#...
+
+Le fichier est projeté en mémoire (mmap) : seul un index des
+enregistrements est construit (24 octets par enregistrement : début, fin et
+id sur 8 octets chacun), les valeurs ne sont décodées qu’à la demande,
+enregistrement par enregistrement et uniquement pour les colonnes
+demandées. Les fichiers plus gros que la RAM sont donc lisibles tels quels.
+
+Exemple :
+    with open_table("agents") as t:
+        for rid, uid, email in t.columns(["uid", "email"]):
+            ...
+
+En ligne de commande :
+    python bd_reader.py agents uid email --limit 5
+"""
+
+import argparse, json, mmap, re
+from array import array
+from pathlib import Path
+
+from create_scripts import ROOT_DIR, SCHEMA, load_schema
+
+BD_DIR   = ROOT_DIR / "bd"
+ENCODING = "latin-1"
+RID      = "_id"   # clé de l’id d’enregistrement (§id§), distincte d’un champ « id »
+
+_RECORD = re.compile(rb"(?:^|\n)\xa7(\d+)\xa7", re.M)
+_FIELD  = re.compile(rb"#(\d+)_")
+
+# ──────────────────────────────────────────────────────────────────────────────
+def split_fields(body: bytes) -> dict:
+    """`#0_a#1_b#` → {0: b"a", 1: b"b"} (indices croissants, « # » toléré dans les valeurs)."""
+    starts = []
+    last = -1
+    for m in _FIELD.finditer(body):
+        idx = int(m.group(1))
+        if idx > last:
+            starts.append((idx, m.start(), m.end()))
+            last = idx
+    out = {}
+    for n, (idx, _, vstart) in enumerate(starts):
+        vend = starts[n + 1][1] if n + 1 < len(starts) else len(body)
+        val = body[vstart:vend]
+        if n + 1 == len(starts) and val.endswith(b"#"):
+            val = val[:-1]
+        out[idx] = val
+    return out
+
+class BdFile:
+    """Fichier .000 projeté en mémoire avec index des débuts d’enregistrements."""
+
+    def __init__(self, path, fields=None):
+        self.path = Path(path)
+        self.fields = list(fields) if fields is not None else None
+        self._fh = self.path.open("rb")
+        size = self.path.stat().st_size
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets = None   # début du corps (#0_…) de chaque enregistrement
+        self._ends = None      # fin du corps (CRLF exclu)
+        self._ids = None
+        self._by_id = None
+
+    # ── cycle de vie ─────────────────────────────────────────────────────────
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── en-tête & index ──────────────────────────────────────────────────────
+    @property
+    def counter(self) -> int:
+        """Compteur d’en-tête (prochain id attribué)."""
+        line = self._mm[:self._mm.find(b"\n")] if self._mm else b""
+        return int(line.strip() or 0)
+
+    def _build_index(self):
+        if self._offsets is not None:
+            return
+        offsets, ends, ids = array("Q"), array("Q"), array("q")
+        for m in _RECORD.finditer(self._mm):
+            if offsets:
+                ends.append(m.start())
+            ids.append(int(m.group(1)))
+            offsets.append(m.end())
+        if offsets:
+            ends.append(len(self._mm))
+        self._offsets, self._ends, self._ids = offsets, ends, ids
+
+    def __len__(self) -> int:
+        self._build_index()
+        return len(self._offsets)
+
+    @property
+    def ids(self) -> array:
+        self._build_index()
+        return self._ids
+
+    def position(self, rid: int) -> int:
+        """Position de l’enregistrement d’id `rid` (index construit au 1er appel)."""
+        if self._by_id is None:
+            self._by_id = {rid: n for n, rid in enumerate(self.ids)}
+        try:
+            return self._by_id[rid]
+        except KeyError:
+            raise KeyError(f"id {rid} absent de {self.path.name}") from None
+
+    # ── décodage ─────────────────────────────────────────────────────────────
+    def raw(self, n: int) -> bytes:
+        self._build_index()
+        return self._mm[self._offsets[n]:self._ends[n]].rstrip(b"\r\n")
+
+    def column_indexes(self, columns) -> list:
+        out = []
+        for c in columns:
+            if isinstance(c, int):
+                out.append(c)
+            elif self.fields is None:
+                raise ValueError(f"{self.path.name} : pas de schéma, colonnes par indice uniquement")
+            elif c not in self.fields:
+                raise ValueError(f"Champ « {c} » absent de {self.path.name}")
+            else:
+                out.append(self.fields.index(c))
+        return out
+
+    def record(self, n: int, columns=None) -> dict:
+        """Enregistrement n°`n` → {nom (ou indice): valeur} décodé à la demande."""
+        parts = split_fields(self.raw(n))
+        idxs = sorted(parts) if columns is None else self.column_indexes(columns)
+        names = self.fields or []
+        out = {RID: self._ids[n]}
+        for i in idxs:
+            key = names[i] if i < len(names) else i
+            val = parts.get(i)
+            out[key] = val.decode(ENCODING) if val is not None else None
+        return out
+
+    def get(self, rid: int, columns=None) -> dict:
+        return self.record(self.position(rid), columns)
+
+    def columns(self, columns):
+        """Itère sur (id, val1, val2, …) pour les colonnes choisies."""
+        idxs = self.column_indexes(columns)
+        for n in range(len(self)):
+            parts = split_fields(self.raw(n))
+            vals = [parts.get(i) for i in idxs]
+            yield (self._ids[n], *(v.decode(ENCODING) if v is not None else None for v in vals))
+
+    def records(self, columns=None):
+        for n in range(len(self)):
+            yield self.record(n, columns)
+
+# ──────────────────────────────────────────────────────────────────────────────
+def data_path(ini_path: str, bd_dir: Path = None) -> Path:
+    """`doc_reflex/1_data/bd/agents_gestion.ini` → `bd/agents_gestion.000`."""
+    return (bd_dir or BD_DIR) / (Path(ini_path).stem + ".000")
+
+def open_table(base: str, schema=None, bd_dir: Path = None) -> BdFile:
+    """Ouvre le .000 d’une table de schema.json (noms de colonnes compris)."""
+    table = (schema or load_schema()).table(base)
+    return BdFile(data_path(table.path, bd_dir), table.fields)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lit une table bd/*.000 en local (JSON lines)")
+    parser.add_argument("base", help="nom de table de schema.json")
+    parser.add_argument("columns", nargs="*", help="colonnes (noms ou indices), toutes par défaut")
+    parser.add_argument("--id", type=int, help="n’affiche que l’enregistrement de cet id")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--schema", type=Path, default=SCHEMA)
+    args = parser.parse_args(argv)
+
+    cols = [int(c) if c.isdigit() else c for c in args.columns] or None
+    with open_table(args.base, load_schema(args.schema)) as t:
+        if args.id is not None:
+            print(json.dumps(t.get(args.id, cols), ensure_ascii=False))
+            return
+        for n, rec in enumerate(t.records(cols)):
+            if args.limit and n >= args.limit:
+                break
+            print(json.dumps(rec, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
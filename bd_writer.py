@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Écriture en masse et compactage des fichiers de données bd/*.000.
+
+Format produit (identique à celui lu par bd_reader.py) :
+    <compteur>\\r\\n        prochain id (max id + 1)
+    1\\r\\n
+    §<id>§#0_<val>#1_<val>#...#\\r\\n      du plus récent au plus ancien
+
+Les colonnes sont placées selon les indices `N_name` de la section [CHAMPS]
+du .ini de la table (bd/<fichier>.ini du chemin de schema.json) et les
+valeurs converties selon `N_type` : date → jj/mm/aaaa, bcd → virgule
+décimale, booléen → 0/1, vide pour None/NaN. Les retours à la ligne dans
+une valeur sont remplacés par des espaces (ils couperaient l’enregistrement).
+
+Sources : DataFrame, CSV (lu en flux) ou requête PostgreSQL (curseur
+serveur). Les enregistrements sont encodés au fil de l’eau dans un fichier
+de travail (seules leurs positions restent en mémoire : 8 octets par
+ligne), relus à l’envers pour mettre les plus récents en tête, suivis des
+enregistrements existants (--append) recopiés depuis l’ancien fichier
+projeté en mémoire. Le tout est écrit par blocs dans un fichier temporaire
+qui remplace l’original d’un coup (os.replace) : un lecteur voit l’ancien
+fichier ou le nouveau, jamais un fichier à moitié écrit.
+
+Compactage : réécrit en flux un .000 sans les enregistrements morts (id en double :
+seule la version la plus récente, en tête de fichier, est gardée ; avec
+--drop-empty, les enregistrements dont tous les champs sont vides) et
+recalcule le compteur d’en-tête (max id + 1, jamais en dessous de l’actuel).
+
+Exemples :
+    python bd_writer.py load agents agents.csv
+    python bd_writer.py load missions missions.csv --append
+    python bd_writer.py query agents "SELECT uid, firstname FROM os_agents" --dsn postgresql+psycopg2://…
+    python bd_writer.py compact agents --drop-empty
+    python bd_writer.py compact --all
+"""
+
+import argparse, csv, mmap, os, re, tempfile
+from array import array
+from datetime import date, datetime
+from pathlib import Path
+
+from bd_reader import BD_DIR, ENCODING, RID, BdFile, data_path, split_fields
+from create_scripts import SCHEMA, load_schema
+
+EOL      = b"\r\n"
+SEP      = "\xa7"        # « § » autour de l’id
+BUFFER   = 1 << 20       # taille des écritures (octets)
+_NEWLINE = re.compile(r"[\r\n]+")
+_CHAMP   = re.compile(r"\s*(\d+)_(name|type)\s*=\s*(.*)")
+
+# ───────────────────────────── champs & valeurs ──────────────────────────────
+def read_champs(ini_path: Path) -> dict:
+    """{nom: (indice, type)} d’après la section [CHAMPS] d’un .ini."""
+    attrs, in_champs = {}, False
+    for line in ini_path.read_text(encoding=ENCODING).splitlines():
+        if line.startswith("["):
+            in_champs = line.strip() == "[CHAMPS]"
+            continue
+        m = _CHAMP.match(line) if in_champs else None
+        if m:
+            attrs.setdefault(int(m.group(1)), {})[m.group(2)] = m.group(3).strip()
+    return {a["name"]: (idx, a.get("type", "")) for idx, a in sorted(attrs.items()) if "name" in a}
+
+def _is_null(value) -> bool:
+    if value is None:
+        return True
+    try:
+        return bool(value != value)  # NaN, NaT
+    except TypeError:
+        return True                  # pandas.NA
+
+def to_oris(value, kind: str = "") -> str:
+    """Valeur Python/pandas → texte Oris selon le type du champ."""
+    if _is_null(value):
+        return ""
+    if type(value).__name__ in ("bool", "bool_"):
+        return "1" if value else "0"
+    if isinstance(value, (datetime, date)):
+        if isinstance(value, datetime) and (value.hour, value.minute, value.second) != (0, 0, 0):
+            return value.strftime("%d/%m/%Y %H:%M:%S")
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, float):
+        text = str(int(value)) if value.is_integer() else repr(float(value))  # numpy 2 : repr → « np.float64(…) »
+        return text.replace(".", ",") if kind in ("bcd", "heure") else text
+    return _NEWLINE.sub(" ", str(value))
+
+def _with_id(rid: int, body: bytes) -> bytes:
+    return f"{SEP}{rid}{SEP}".encode(ENCODING) + body
+
+def encode_record(rid: int, values: dict) -> bytes:
+    """{indice: texte} → `§id§#0_…#1_…#` (latin-1, caractères hors latin-1 remplacés)."""
+    body = "#".join(f"{i}_{v}" for i, v in sorted(values.items()))
+    return _with_id(rid, f"#{body}#".encode(ENCODING, errors="replace"))
+
+# ───────────────────────────── sources ───────────────────────────────────────
+def rows_from_frame(df):
+    """Lignes d’un DataFrame (colonne `_id` facultative pour imposer les ids)."""
+    columns = list(df.columns)
+    for values in df.itertuples(index=False, name=None):
+        yield dict(zip(columns, values))
+
+def rows_from_csv(path, delimiter: str = ",", encoding: str = "utf-8"):
+    """Lignes d’un CSV avec en-tête (lu en flux, sans pandas)."""
+    with open(path, newline="", encoding=encoding) as f:
+        yield from csv.DictReader(f, delimiter=delimiter)
+
+def rows_from_query(connection, sql: str, chunk_rows: int = 10000):
+    """Lignes d’une requête SQL lues par paquets via un curseur côté serveur."""
+    from sqlalchemy import text  # seulement pour cette source
+
+    result = connection.execution_options(stream_results=True).execute(text(sql))
+    for part in result.mappings().partitions(chunk_rows):
+        for row in part:
+            yield dict(row)
+
+# ───────────────────────────── écriture ──────────────────────────────────────
+def _write_tmp(path: Path, records, counter: int) -> Path:
+    """Écrit en-tête + `records` dans `<path>.tmp` (synchronisé sur disque) ; renvoie ce chemin."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb", buffering=BUFFER) as f:
+        f.write(str(counter).encode() + EOL + b"1" + EOL)
+        for rec in records:
+            f.write(rec + EOL)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+def write_records(path: Path, records, counter: int):
+    """Écrit en-tête + `records` (octets, déjà dans l’ordre du fichier) puis remplace `path`."""
+    os.replace(_write_tmp(path, records, counter), path)
+
+def write_table(base: str, rows, schema=None, bd_dir: Path = None, append: bool = False) -> int:
+    """Écrit `rows` (dicts nom de champ → valeur) dans le .000 de `base`.
+
+    Sans `append`, le fichier est remplacé ; avec, les lignes sont ajoutées
+    avant les enregistrements existants. Les ids viennent de la colonne `_id`
+    si présente, sinon ils suivent le compteur du fichier. Renvoie le nombre
+    de lignes écrites.
+    """
+    schema = schema or load_schema()
+    table = schema.table(base)
+    bd_dir = bd_dir or BD_DIR
+    path = data_path(table.path, bd_dir)
+    champs = read_champs(bd_dir / Path(table.path).name)
+    missing = [f for f in table.fields if f not in champs]
+    if missing:
+        raise ValueError(f"{base} : champ(s) {', '.join(missing)} absent(s) de [CHAMPS]")
+
+    old = BdFile(path) if append and path.exists() else None
+    try:
+        next_id = max(old.counter, max(old.ids, default=0) + 1) if old is not None else 1
+        # lignes encodées au fil de l’eau dans un fichier de travail, fins d’enregistrement en mémoire
+        with tempfile.TemporaryFile(dir=path.parent) as spool:
+            ends, top = array("Q"), next_id - 1
+            for row in rows:
+                unknown = [k for k in row if k != RID and k not in champs]
+                if unknown:
+                    raise ValueError(f"{base} : colonne(s) inconnue(s) {', '.join(map(str, unknown))}")
+                if not _is_null(row.get(RID)) and str(row.get(RID)).strip():
+                    rid = int(row[RID])
+                else:
+                    rid = top + 1
+                top = max(top, rid)
+                values = {idx: "" for idx, _ in champs.values()}
+                for name, value in row.items():
+                    if name != RID:
+                        idx, kind = champs[name]
+                        values[idx] = to_oris(value, kind)
+                spool.write(encode_record(rid, values))
+                ends.append(spool.tell())
+            spool.flush()
+            spooled = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) if ends else b""
+
+            def records():
+                for n in reversed(range(len(ends))):  # le plus récent en tête, comme Oris
+                    yield spooled[ends[n - 1] if n else 0:ends[n]]
+                if old is not None:
+                    for n in range(len(old)):
+                        yield _with_id(old.ids[n], old.raw(n))
+            try:
+                tmp = _write_tmp(path, records(), top + 1)
+            finally:
+                if ends:
+                    spooled.close()
+    finally:
+        if old is not None:
+            old.close()
+    os.replace(tmp, path)  # après fermeture de l’ancien fichier projeté
+    return len(ends)
+
+# ───────────────────────────── compactage ────────────────────────────────────
+def compact(path: Path, drop_empty: bool = False) -> dict:
+    """Réécrit `path` sans doublons d’id (ni enregistrements vides) ; renvoie les compteurs.
+
+    Les enregistrements gardés sont recopiés en flux depuis le fichier projeté ;
+    seuls les ids déjà vus restent en mémoire.
+    """
+    stats = {"kept": 0, "duplicates": 0, "empty": 0}
+    with BdFile(path) as bd:
+        # jamais en dessous du compteur actuel : un id supprimé n’est pas réattribué
+        counter = max(bd.counter, max(bd.ids, default=0) + 1)
+
+        def kept():
+            seen = set()
+            for n in range(len(bd)):
+                rid, body = bd.ids[n], bd.raw(n)
+                if rid in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(rid)
+                if drop_empty and not any(v.strip() for v in split_fields(body).values()):
+                    stats["empty"] += 1
+                    continue
+                stats["kept"] += 1
+                yield _with_id(rid, body)
+        tmp = _write_tmp(path, kept(), counter)
+    os.replace(tmp, path)  # après fermeture du fichier projeté
+    return stats
+
+# ───────────────────────────── CLI ───────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Écrit / compacte les fichiers bd/*.000")
+    parser.add_argument("--schema", type=Path, default=SCHEMA)
+    parser.add_argument("--bd", type=Path, default=BD_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="CSV → .000")
+    load.add_argument("base")
+    load.add_argument("csv", type=Path)
+    load.add_argument("--delimiter", default=",")
+    load.add_argument("--encoding", default="utf-8")
+    load.add_argument("--append", action="store_true", help="garde les enregistrements existants")
+
+    query = sub.add_parser("query", help="requête PostgreSQL → .000")
+    query.add_argument("base")
+    query.add_argument("sql")
+    query.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="URL SQLAlchemy (défaut : $DATABASE_URL)")
+    query.add_argument("--append", action="store_true")
+
+    comp = sub.add_parser("compact", help="supprime les enregistrements morts")
+    comp.add_argument("bases", nargs="*")
+    comp.add_argument("--all", action="store_true", help="toutes les tables de schema.json")
+    comp.add_argument("--drop-empty", action="store_true", help="supprime aussi les enregistrements vides")
+    args = parser.parse_args(argv)
+
+    schema = load_schema(args.schema)
+    if args.command == "load":
+        n = write_table(args.base, rows_from_csv(args.csv, args.delimiter, args.encoding),
+                        schema, args.bd, args.append)
+        print(f"✓ {args.base} : {n} enregistrement(s) écrit(s)")
+    elif args.command == "query":
+        if not args.dsn:
+            raise SystemExit("--dsn (ou $DATABASE_URL) requis")
+        from sqlalchemy import create_engine
+
+        with create_engine(args.dsn).connect() as connection:
+            n = write_table(args.base, rows_from_query(connection, args.sql), schema, args.bd, args.append)
+        print(f"✓ {args.base} : {n} enregistrement(s) écrit(s)")
+    else:
+        bases = list(schema.tables) if args.all else args.bases
+        for base in bases:
+            path = data_path(schema.table(base).path, args.bd)
+            if not path.exists():
+                print(f"⚠️  {base} : {path} absent, ignoré")
+                continue
+            st = compact(path, args.drop_empty)
+            print(f"✓ {base} : {st['kept']} gardé(s), {st['duplicates']} doublon(s), {st['empty']} vide(s)")
+
+if __name__ == "__main__":
+    main()
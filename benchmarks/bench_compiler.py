@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Benchmark du compilateur JSON → .oris (create_scripts.py).
+
+Génère un schema.json et une arborescence format/** synthétiques dans un
+dossier temporaire, puis mesure :
+  • json_file_to_oris          (fichier par fichier, lecture comprise)
+  • _combine_param_segments    (assemblage de la ligne paramètres seul)
+  • main()                     (pipeline complet, plein / incrémental à vide / --jobs)
+
+Chaque cas est d’abord exécuté une fois à blanc (échauffement des caches,
+imports, fichiers) sous tracemalloc pour le pic mémoire Python, puis
+--repeat fois sans instrumentation : le débit retenu est celui de la
+meilleure exécution (la médiane est affichée à côté pour juger du bruit).
+
+Les résultats peuvent être enregistrés comme référence puis comparés : la
+référence garde les paramètres du lancement (--files, --narrow, --wide,
+--jobs, --seed) et une comparaison avec d’autres paramètres est refusée
+(code 2). Toute mesure plus lente que la référence au-delà de la tolérance
+fait échouer la commande (code 1).
+
+Exemples :
+    python benchmarks/bench_compiler.py --files 2000 --save-baseline bench_baseline.json
+    python benchmarks/bench_compiler.py --files 2000 --compare bench_baseline.json
+"""
+
+import argparse, contextlib, io, json, os, random, statistics, sys, tempfile, time, tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import create_scripts as cs  # noqa: E402
+
+# ───────────────────────────── données synthétiques ──────────────────────────
+def synth_schema(narrow: int, wide: int, narrow_fields: int = 5, wide_fields: int = 40) -> dict:
+    schema = {}
+    for n in range(narrow):
+        schema[f"narrow_{n}"] = {"path": f"doc_reflex/1_data/bd/narrow_{n}_gestion.ini",
+                                 "fields": [f"f{i}" for i in range(narrow_fields)]}
+    for n in range(wide):
+        schema[f"wide_{n}"] = {"path": f"doc_reflex/1_data/bd/wide_{n}_gestion.ini",
+                               "fields": [f"col_{i}" for i in range(wide_fields)]}
+    return schema
+
+def _value(rng: random.Random, name: str):
+    kind = rng.random()
+    if kind < 0.4:
+        return f"${name}"
+    if kind < 0.7:
+        return f"&{name}"
+    return rng.choice([name, 1, "0", "oui"])
+
+def _op(rng: random.Random, schema: dict, kind: str) -> dict:
+    base = rng.choice(list(schema))
+    fields = schema[base]["fields"]
+    pick = lambda k: rng.sample(fields, min(k, len(fields)))
+    filters = {f: _value(rng, f) for f in pick(rng.randint(0, 2))}
+    if kind == "read":
+        return {"type": "read", "base": base,
+                "fields": "*" if rng.random() < 0.3 else pick(rng.randint(1, len(fields))),
+                "filters": filters}
+    values = {f: _value(rng, f) for f in pick(rng.randint(1, len(fields)))}
+    if kind == "write":
+        return {"type": "write", "base": base, "fields": values, "filters": filters}
+    return {"type": "new", "base": base, "fields": values}
+
+def synth_format_tree(root: Path, schema: dict, files: int, seed: int = 0):
+    rng = random.Random(seed)
+    for n in range(files):
+        kind = rng.choice(["read", "write", "new", "multi"])
+        if kind == "multi":
+            data = {"operations": [_op(rng, schema, rng.choice(["read", "write", "new"]))
+                                   for _ in range(rng.randint(2, 5))]}
+        else:
+            data = _op(rng, schema, kind)
+        path = root / f"group_{n % 20}" / f"sub_{n % 7}" / f"endpoint_{n}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+# ───────────────────────────── mesures ───────────────────────────────────────
+PARAMS = ("files", "narrow", "wide", "jobs", "seed")
+
+def measure(fn, units: int, repeat: int = 5, setup=None):
+    """Échauffement tracé (pic mémoire) puis `repeat` exécutions chronométrées ;
+    `setup()` est appelé hors chrono avant chacune."""
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    best, median = min(times), statistics.median(times)
+    return {"seconds": best, "median_s": median, "per_sec": units / max(best, 1e-9),
+            "median_per_sec": units / max(median, 1e-9), "peak_kib": peak / 1024}
+
+@contextlib.contextmanager
+def compiler_dirs(work: Path):
+    """Redirige create_scripts vers `work` (format/, sdk/, schema.json, manifeste)."""
+    saved = cs.FORMAT_DIR, cs.SDK_DIR, cs.SCHEMA, cs.MANIFEST
+    cs.FORMAT_DIR, cs.SDK_DIR = work / "format", work / "sdk"
+    cs.SCHEMA, cs.MANIFEST = work / "schema.json", work / ".sdk_manifest.json"
+    try:
+        yield
+    finally:
+        cs.FORMAT_DIR, cs.SDK_DIR, cs.SCHEMA, cs.MANIFEST = saved
+
+def run(files: int, narrow: int, wide: int, jobs: int, seed: int, repeat: int = 5) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_oris_") as tmp:
+        work = Path(tmp)
+        raw = synth_schema(narrow, wide)
+        (work / "schema.json").write_text(json.dumps(raw), encoding="utf-8")
+        synth_format_tree(work / "format", raw, files, seed)
+        sources = sorted((work / "format").rglob("*.json"))
+        schema = cs.load_schema(work / "schema.json")
+
+        def compile_all():
+            for src in sources:
+                cs.json_file_to_oris(src, schema)
+        results["json_file_to_oris"] = measure(compile_all, len(sources), repeat)
+
+        rng = random.Random(seed)
+        segments = [[("L", "json=true")] + [
+            ("D", f'$fpar("p{i}")') if rng.random() < 0.5 else ("L", f"&fils{i}==&fil{i}='v'")
+            for i in range(rng.randint(1, 30))
+        ] for _ in range(2000)]
+        def combine_all():
+            for _ in range(10):
+                for seg in segments:
+                    cs._combine_param_segments(seg, end_amp=False)
+        results["_combine_param_segments"] = measure(combine_all, 10 * len(segments), repeat)
+
+        def forget_manifest():
+            cs.MANIFEST.unlink(missing_ok=True)
+
+        with compiler_dirs(work), contextlib.redirect_stdout(io.StringIO()):
+            results["main_full"] = measure(lambda: cs.main(), len(sources), repeat, forget_manifest)
+            results["main_incremental_noop"] = measure(lambda: cs.main(incremental=True), len(sources), repeat)
+            if jobs > 1:
+                results[f"main_jobs_{jobs}"] = measure(lambda: cs.main(jobs=jobs), len(sources), repeat,
+                                                       forget_manifest)
+    return results
+
+# ───────────────────────────── référence ─────────────────────────────────────
+def check_params(params: dict, baseline: dict) -> bool:
+    """Vrai si la référence a été mesurée avec les mêmes paramètres."""
+    saved = baseline.get("params")
+    if saved is None:
+        print("  référence sans paramètres enregistrés : à régénérer avec --save-baseline")
+        return False
+    diff = [k for k in PARAMS if saved.get(k) != params[k]]
+    for k in diff:
+        print(f"  --{k} : {params[k]} ici, {saved.get(k)} dans la référence")
+    return not diff
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    for name, res in results.items():
+        ref = baseline["results"].get(name)
+        if ref is None:
+            print(f"  {name:<28} (absent de la référence)")
+            continue
+        ratio = res["per_sec"] / max(ref["per_sec"], 1e-9)
+        flag = "✓" if ratio >= 1 - tolerance else "⚠️ régression"
+        ok &= ratio >= 1 - tolerance
+        print(f"  {name:<28} {ratio:6.2f}× la référence  {flag}")
+    return ok
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de create_scripts.py")
+    parser.add_argument("--files", type=int, default=1000, help="nombre de .json synthétiques")
+    parser.add_argument("--narrow", type=int, default=10, help="tables étroites (5 champs)")
+    parser.add_argument("--wide", type=int, default=5, help="tables larges (40 champs)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="processus pour main(jobs=N)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="exécutions chronométrées par cas (meilleure retenue)")
+    parser.add_argument("--save-baseline", type=Path, metavar="FICHIER")
+    parser.add_argument("--compare", type=Path, metavar="FICHIER")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="baisse de débit tolérée (0.2 = 20 %%)")
+    args = parser.parse_args(argv)
+
+    params = {k: getattr(args, k) for k in PARAMS}
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        if not check_params(params, baseline):
+            print(f"Comparaison impossible avec {args.compare}")
+            sys.exit(2)
+
+    results = run(args.files, args.narrow, args.wide, args.jobs, args.seed, args.repeat)
+    print(f"{args.files} fichiers, {args.narrow} tables étroites, {args.wide} larges, "
+          f"meilleure de {args.repeat} exécution(s)")
+    for name, res in results.items():
+        print(f"  {name:<28} {res['per_sec']:>10.0f} /s  {res['seconds']:7.3f} s  "
+              f"(médiane {res['median_per_sec']:>10.0f} /s)  pic {res['peak_kib']:9.0f} Kio")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps({"params": params, "results": results}, indent=2),
+                                      encoding="utf-8")
+        print(f"Référence enregistrée dans {args.save_baseline}")
+    if baseline is not None:
+        print("Comparaison :")
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
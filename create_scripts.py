@@ -23,21 +23,95 @@ Règle "ré-ouvrir après $fpar":
   • Sans $fpar → ,json=true&...
   • Avec $fpar → ,="json=true...="$fpar("x")&"…"$fpar("y")&"…"
                   ^——— guillemets rouvrts précédés d’un « & »
+
+Mode incrémental (--incremental) :
+  • un manifeste (.sdk_manifest.json) garde, pour chaque .json, l’empreinte
+    de ses entrées : contenu du fichier + entrées du schéma des bases utilisées
+  • il garde aussi l’empreinte du compilateur (ce fichier) : toute
+    modification du générateur invalide le manifeste et tout est régénéré
+  • seuls les .oris dont l’empreinte a changé sont régénérés
+  • les .oris générés dont le .json source a disparu sont supprimés
+
+Mode parallèle (--jobs N) :
+  • les .json à compiler sont répartis sur N processus (schéma chargé une
+    fois par processus), chaque .oris est écrit de façon atomique
+  • le rapport ✓/⚠️ suit l’ordre trié des fichiers, quel que soit N
+
+Mesures (ORIS_TRACE=fichier.jsonl et/ou ORIS_TRACE_PROM=fichier.prom) :
+  • durée de compilation de chaque fichier (span compile.file, --jobs 1
+    seulement : les processus du pool ne remontent pas leurs mesures)
+  • nombre de fichiers compilés / en erreur / inchangés
+
+Optimisation (`"optimize": true` dans le .json, ou --optimize pour tous) :
+  • lectures en double supprimées
+  • lectures d’une même base avec les mêmes filtres fusionnées (union des
+    champs), tant qu’aucune écriture sur cette base ne les sépare
+  • masque `*` réduit aux champs déclarés dans `"uses": [...]` de l’opération
+  • chaque modification est signalée sous la ligne ✓ du fichier
+  ⚠️ une fusion change la forme de la réponse (un bloc de moins) : à activer
+    seulement si le consommateur s’appuie sur les champs et non sur l’ordre
 """
 
-import json, shutil, os
+import argparse, hashlib, json, shutil, os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from oris_python.tracing import configure_from_env, count, span
+
 ROOT_DIR   = Path(__file__).resolve().parent
 FORMAT_DIR = ROOT_DIR / "format"
 SDK_DIR    = ROOT_DIR / "sdk"
 SCHEMA     = ROOT_DIR / "schema.json"
+MANIFEST   = ROOT_DIR / ".sdk_manifest.json"
+# empreinte du générateur : un changement de code rend tous les .oris périmés
+COMPILER   = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
 
 # ──────────────────────────────────────────────────────────────────────────────
-def load_schema() -> dict:
-    if not SCHEMA.exists():
+class Table:
+    """Table du schéma précompilée : index champ → position et masque `*`."""
+    __slots__ = ("name", "path", "fields", "index", "star_mask")
+
+    def __init__(self, name: str, entry: dict):
+        if not isinstance(entry, dict):
+            raise ValueError(f"schema.json : entrée « {name} » invalide")
+        path, fields = entry.get("path"), entry.get("fields")
+        if not isinstance(path, str) or not path:
+            raise ValueError(f"schema.json : « path » manquant pour « {name} »")
+        if not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields):
+            raise ValueError(f"schema.json : « fields » invalide pour « {name} »")
+        self.name, self.path, self.fields = name, path, fields
+        self.index = {}
+        for i, f in enumerate(fields):
+            if f in self.index:
+                raise ValueError(f"schema.json : champ « {f} » en double dans « {name} »")
+            self.index[f] = i
+        self.star_mask = ";".join(map(str, range(len(fields))))
+
+    def idx(self, field) -> int:
+        try:
+            return self.index[field]
+        except KeyError:
+            raise ValueError(f"Champ « {field} » absent de la table « {self.name} »") from None
+
+class Schema:
+    """schema.json compilé une seule fois (validé à la construction)."""
+    def __init__(self, raw: dict):
+        if not isinstance(raw, dict):
+            raise ValueError("schema.json : objet JSON attendu")
+        self.raw = raw
+        self.tables = {name: Table(name, entry) for name, entry in raw.items()}
+
+    def table(self, base) -> Table:
+        try:
+            return self.tables[base]
+        except KeyError:
+            raise ValueError(f"Base « {base} » absente de schema.json") from None
+
+def load_schema(path: Path = None) -> Schema:
+    path = path or SCHEMA
+    if not path.exists():
         raise FileNotFoundError("schema.json manquant")
-    return json.loads(SCHEMA.read_text(encoding="utf-8"))
+    return Schema(json.loads(path.read_text(encoding="utf-8")))
 
 # ───────────────────────── valeurs LITERAL / & / $ ───────────────────────────
 def val_read_to_oris(val):
@@ -113,63 +187,55 @@ def _add_value(segments, prefix_lit: str, value_str: str):
         segments.append(('L', prefix_lit + value_str))
 
 # ─────────────────────────────── outils communs ──────────────────────────────
-def sorted_indices(request_fields, schema_fields, base):
-    try:
-        return sorted(schema_fields.index(f) for f in request_fields)
-    except ValueError as err:
-        missing = str(err).split("'")[1]
-        raise ValueError(f"Champ « {missing} » absent de la table « {base} »")
+def sorted_indices(request_fields, table: Table):
+    return sorted(table.idx(f) for f in request_fields)
 
-def build_filter_segments(filters, schema_fields, base, *, for_write_new: bool):
+def build_filter_segments(filters, table: Table, *, for_write_new: bool):
     if not filters:
         return []
     segs = []
     conv = val_write_new_to_oris if for_write_new else val_read_to_oris
     for field, v in filters.items():
-        if field not in schema_fields:
-            raise ValueError(f"Champ « {field} » absent de la table « {base} »")
-        idx = schema_fields.index(field)
+        idx = table.idx(field)
         prefix = f"&fils{idx}==&fil{idx}="
         _add_value(segs, prefix, conv(v))
     return segs
 
 # ───────────────────────────── sous-conversions ──────────────────────────────
-def _to_read(op, schema):
-    base = op["base"]; fields = op.get("fields", []); filt = op.get("filters", {})
-    path = schema[base]["path"]; s_fields = schema[base]["fields"]
+def _to_read(op, schema: Schema):
+    fields = op.get("fields", []); filt = op.get("filters", {})
+    table = schema.table(op["base"])
     if isinstance(fields, str) and fields.strip() == "*":
-        mask = ";".join(map(str, range(len(s_fields))))
+        mask = table.star_mask
     else:
-        mask = ";".join(map(str, sorted_indices(fields, s_fields, base)))
+        mask = ";".join(map(str, sorted_indices(fields, table)))
     segments = [('L', "json=true")]
-    segments += build_filter_segments(filt, s_fields, base, for_write_new=False)
+    segments += build_filter_segments(filt, table, for_write_new=False)
     params_line = _combine_param_segments(segments, end_amp=False)
-    return f"fsdk_read(\n{path}\n,{mask}\n{params_line}\n)"
+    return f"fsdk_read(\n{table.path}\n,{mask}\n{params_line}\n)"
 
-def _to_write(op, schema):
-    base, fdict, filt = op["base"], op.get("fields", {}), op.get("filters", {})
-    path = schema[base]["path"]; s_fields = schema[base]["fields"]
+def _to_write(op, schema: Schema):
+    fdict, filt = op.get("fields", {}), op.get("filters", {})
+    table = schema.table(op["base"])
     # Masque = uniquement les colonnes modifiées
-    mask = ";".join(map(str, sorted_indices(fdict.keys(), s_fields, base)))
+    mask = ";".join(map(str, sorted_indices(fdict.keys(), table)))
     segments = [('L', "json=true")]
     for k, v in fdict.items():
-        idx = s_fields.index(k)
-        _add_value(segments, f"&mch{idx}=", val_write_new_to_oris(v))
-    segments += build_filter_segments(filt, s_fields, base, for_write_new=True)
+        _add_value(segments, f"&mch{table.idx(k)}=", val_write_new_to_oris(v))
+    segments += build_filter_segments(filt, table, for_write_new=True)
     params_line = _combine_param_segments(segments, end_amp=False)
-    return f"fsdk_write(\n{path}\n,{mask}\n{params_line}\n)"
+    return f"fsdk_write(\n{table.path}\n,{mask}\n{params_line}\n)"
 
-def _to_new(op, schema):
-    base, fdict = op["base"], op.get("fields", {})
-    path = schema[base]["path"]; s_fields = schema[base]["fields"]
+def _to_new(op, schema: Schema):
+    fdict = op.get("fields", {})
+    table = schema.table(op["base"])
     # 🔁 Changement : masque = uniquement les colonnes modifiées (PAS de 0 automatique)
-    mask = ";".join(map(str, sorted_indices(fdict.keys(), s_fields, base)))
+    mask = ";".join(map(str, sorted_indices(fdict.keys(), table)))
     segments = [('L', "json=true")]
     for k, v in fdict.items():
-        idx = s_fields.index(k)
-        _add_value(segments, f"&mch{idx}=", val_write_new_to_oris(v))
+        _add_value(segments, f"&mch{table.idx(k)}=", val_write_new_to_oris(v))
     params_line = _combine_param_segments(segments, end_amp=True)  # NEW → termine par &
-    return f"fsdk_new(\n{path}\n,{mask}\n{params_line}\n)"
+    return f"fsdk_new(\n{table.path}\n,{mask}\n{params_line}\n)"
 
 def op_to_oris(op, schema):
     t = op["type"]
@@ -178,6 +244,62 @@ def op_to_oris(op, schema):
     if t == "new":   return _to_new(op, schema)
     raise ValueError(f"type « {t} » non pris en charge")
 
+# ───────────────────────────── passe d’optimisation ──────────────────────────
+def _op_key(op) -> str:
+    return json.dumps(op, sort_keys=True, ensure_ascii=False)
+
+def _read_fields(op, table: Table):
+    """Champs lus par une opération read (None = `*`)."""
+    fields = op.get("fields", [])
+    if isinstance(fields, str) and fields.strip() == "*":
+        return None
+    return [table.fields[i] for i in sorted_indices(fields, table)]
+
+def optimize_operations(ops, schema: Schema, report: list = None) -> list:
+    """Supprime, fusionne et réduit les lectures d’une liste `operations`.
+
+    Renvoie une nouvelle liste (l’entrée n’est pas modifiée) ; chaque
+    modification est décrite dans `report`.
+    """
+    report = [] if report is None else report
+    out, seen, open_reads = [], {}, {}
+    for n, op in enumerate(ops, 1):
+        if op.get("type") != "read":
+            out.append(op)
+            # une écriture peut changer le résultat des lectures suivantes
+            open_reads.pop(op.get("base"), None)
+            seen = {k: base for k, base in seen.items() if base != op.get("base")}
+            continue
+
+        table = schema.table(op["base"])
+        op = dict(op)
+        uses = op.pop("uses", None)
+        if uses is not None and _read_fields(op, table) is None:
+            op["fields"] = [table.fields[i] for i in sorted_indices(uses, table)]
+            report.append(f"opération {n} ({op['base']}) : masque * réduit à {len(op['fields'])}"
+                          f"/{len(table.fields)} champ(s)")
+
+        key = _op_key(op)
+        if key in seen:
+            report.append(f"opération {n} ({op['base']}) : lecture en double supprimée")
+            continue
+        seen[key] = op["base"]
+
+        filters = _op_key(op.get("filters", {}))
+        prev = open_reads.get(op["base"])
+        if prev is not None and prev[0] == filters:
+            target = prev[1]
+            a, b = _read_fields(target, table), _read_fields(op, table)
+            if a is None or b is None:
+                target["fields"] = "*"
+            else:
+                target["fields"] = [f for f in table.fields if f in set(a) | set(b)]
+            report.append(f"opération {n} ({op['base']}) : fusionnée avec l’opération {prev[2]}")
+            continue
+        out.append(op)
+        open_reads[op["base"]] = (filters, op, n)
+    return out
+
 # ───────────────────────────── type « multi » (séquence & séparateurs) ──────
 def multi_to_oris(data, schema):
     parts = []
@@ -189,9 +311,14 @@ def multi_to_oris(data, schema):
     return "\n&\n".join(parts)
 
 # ───────────────────────────── conversion fichier ────────────────────────────
-def json_file_to_oris(json_path: Path, schema: dict) -> str:
+def json_file_to_oris(json_path: Path, schema: Schema, optimize: bool = False, report: list = None) -> str:
     data = json.loads(json_path.read_text(encoding="utf-8"))
+    return json_to_oris(data, schema, json_path.name, optimize, report)
+
+def json_to_oris(data: dict, schema: Schema, name: str, optimize: bool = False, report: list = None) -> str:
     t = data.get("type")
+    if (optimize or data.get("optimize")) and isinstance(data.get("operations"), list) and data["operations"]:
+        data = dict(data, operations=optimize_operations(data["operations"], schema, report))
 
     if t == "multi":
         return multi_to_oris(data, schema)
@@ -199,7 +326,7 @@ def json_file_to_oris(json_path: Path, schema: dict) -> str:
     if t is None and isinstance(data.get("operations"), list):
         ops = data["operations"]
         if len(ops) == 0:
-            raise ValueError(f"{json_path.name}: 'operations' est vide")
+            raise ValueError(f"{name}: 'operations' est vide")
         if len(ops) == 1:
             return "=" + op_to_oris(ops[0], schema)
         return multi_to_oris(data, schema)
@@ -211,7 +338,7 @@ def json_file_to_oris(json_path: Path, schema: dict) -> str:
     if t == "new":
         return "=" + _to_new(data, schema)
 
-    raise ValueError(f"{json_path.name}: type « {t} » non pris en charge")
+    raise ValueError(f"{name}: type « {t} » non pris en charge")
 
 def mirror_format_tree():
     for root, dirs, files in os.walk(FORMAT_DIR):
@@ -223,22 +350,161 @@ def mirror_format_tree():
             if src.suffix.lower() != ".json" and not dst.exists():
                 shutil.copy2(src, dst)
 
+# ───────────────────────────── manifeste incrémental ─────────────────────────
+def bases_used(data) -> list:
+    """Bases du schéma référencées par une requête (seule ou `operations`)."""
+    ops = data.get("operations") if isinstance(data.get("operations"), list) else [data]
+    return sorted({op["base"] for op in ops if isinstance(op, dict) and "base" in op})
+
+def input_hash(raw: bytes, data, schema: Schema, optimize: bool = False) -> str:
+    """Empreinte des entrées d’un .oris : source JSON + entrées de schéma utilisées
+    (+ option --optimize)."""
+    h = hashlib.sha256(raw)
+    if optimize:
+        h.update(b"\0--optimize")
+    for base in bases_used(data):
+        h.update(b"\0" + base.encode("utf-8") + b"\0")
+        entry = schema.raw.get(base)
+        # « version » (update_schema.py) résume déjà l’entrée de la table
+        if isinstance(entry, dict) and "version" in entry:
+            h.update(entry["version"].encode("utf-8"))
+        else:
+            h.update(json.dumps(entry, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+def load_manifest() -> dict:
+    if not MANIFEST.exists():
+        return {}
+    try:
+        data = json.loads(MANIFEST.read_text(encoding="utf-8"))
+        files = data.get("files", {})
+        if data.get("compiler") != COMPILER:
+            # compilateur modifié → tout est régénéré (les sorties restent connues
+            # pour supprimer celles dont la source a disparu)
+            return {rel: dict(entry, hash=None) for rel, entry in files.items()}
+        return files
+    except (ValueError, AttributeError):
+        return {}  # manifeste illisible → reconstruction complète
+
+def save_manifest(entries: dict):
+    MANIFEST.write_text(
+        json.dumps({"compiler": COMPILER, "files": dict(sorted(entries.items()))}, indent=2, ensure_ascii=False),
+        encoding="utf-8",
+    )
+
+def remove_orphans(manifest: dict, sources: set) -> list:
+    """Supprime les .oris générés dont le .json source n’existe plus ; renvoie leurs chemins."""
+    removed = []
+    for rel in sorted(set(manifest) - sources):
+        out = SDK_DIR / manifest.pop(rel)["output"]
+        if out.exists():
+            out.unlink()
+            print(f"🗑  {out}: source {rel} supprimée")
+            removed.append(out)
+    return removed
+
+# ───────────────────────────── compilation (locale ou pool) ─────────────────
+def write_atomic(out: Path, text: str):
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, out)
+
+def compile_one(json_file: Path, out: Path, data: dict, schema: Schema, optimize: bool = False):
+    """Compile un .json déjà chargé ; renvoie (erreur ou None, rapport d’optimisation)."""
+    report = []
+    try:
+        with span("compile.file", detail=str(json_file)):
+            write_atomic(out, json_to_oris(data, schema, json_file.name, optimize, report))
+        return None, report
+    except Exception as e:
+        return str(e), report
+
+_worker_schema = None
+
+def _init_worker(schema_path: str):
+    global _worker_schema
+    _worker_schema = load_schema(Path(schema_path))
+
+def _compile_in_worker(task):
+    json_file, out, data, optimize = task
+    return compile_one(json_file, out, data, _worker_schema, optimize)
+
 # ──────────────────────────────────────────────────────────────────────────────
-def main():
+def main(incremental: bool = False, jobs: int = 1, optimize: bool = False) -> dict:
+    """Compile format/** → sdk/** ; renvoie {"written": [.oris], "removed": [.oris]}."""
     schema = load_schema()
     mirror_format_tree()
-    ok = ko = 0
-    for json_file in FORMAT_DIR.rglob("*.json"):
+    manifest = load_manifest()
+    ok = ko = skipped = 0
+    written = []
+    sources = set()
+    tasks, pending, errors = [], [], {}
+    for json_file in sorted(FORMAT_DIR.rglob("*.json")):
         rel = json_file.relative_to(FORMAT_DIR)
         out = (SDK_DIR / rel).with_suffix(".oris")
+        key = rel.as_posix()
+        sources.add(key)
         try:
-            out.write_text(json_file_to_oris(json_file, schema), encoding="utf-8")
+            raw = json_file.read_bytes()
+            data = json.loads(raw.decode("utf-8"))
+        except Exception as e:
+            pending.append((key, json_file, out, None))
+            errors[key] = str(e)
+            continue
+        digest = input_hash(raw, data, schema, optimize)
+        entry = manifest.get(key)
+        if incremental and entry and entry["hash"] == digest and out.exists():
+            skipped += 1
+            continue
+        pending.append((key, json_file, out, digest))
+        tasks.append((json_file, out, data, optimize))
+
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(str(SCHEMA),)) as pool:
+            results = list(pool.map(_compile_in_worker, tasks,
+                                    chunksize=max(1, len(tasks) // (jobs * 4))))
+    else:
+        results = [compile_one(f, o, d, schema, opt) for f, o, d, opt in tasks]
+
+    results = iter(results)
+    for key, json_file, out, digest in pending:
+        err, report = (errors.get(key), []) if digest is None else next(results)
+        if err is None:
+            manifest[key] = {"hash": digest, "output": out.relative_to(SDK_DIR).as_posix()}
             print(f"✓ {json_file} → {out}")
+            for line in report:
+                print(f"   ↳ {line}")
+            written.append(out)
             ok += 1
-        except Exception as e:
-            print(f"⚠️  {json_file}: ignoré – {e}")
+        else:
+            if key in manifest:
+                # l’ancien .oris reste suivi : recompilé au prochain passage,
+                # supprimé si la source disparaît
+                manifest[key]["hash"] = None
+            print(f"⚠️  {json_file}: ignoré – {err}")
             ko += 1
-    print(f"\n✅ Fin : {ok} fichier(s) généré(s), {ko} ignoré(s).")
+    removed = remove_orphans(manifest, sources)
+    save_manifest(manifest)
+    count("compile.files", ok, result="ok")
+    count("compile.files", ko, result="error")
+    count("compile.files", skipped, result="unchanged")
+    print(f"\n✅ Fin : {ok} fichier(s) généré(s), {ko} ignoré(s)"
+          + (f", {skipped} inchangé(s), {len(removed)} supprimé(s)." if incremental else "."))
+    return {"written": written, "removed": removed}
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Compile format/**/*.json en sdk/**/*.oris")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="ne régénère que les .oris dont les entrées ont changé")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="nombre de processus de compilation (0 = nombre de cœurs)")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="optimise toutes les requêtes `operations` (voir « optimize »)")
+    args = parser.parse_args(argv)
+    configure_from_env()
+    with span("compile.main"):
+        main(incremental=args.incremental, jobs=args.jobs or os.cpu_count() or 1, optimize=args.optimize)
 
-# if __name__ == "__main__":
-#     main()
+if __name__ == "__main__":
+    cli()
@@ -5,12 +5,34 @@ Synchronise uniquement les fichiers *.oris du dossier local ./sdk vers
 
 • Les fichiers *.oris existants côté FTP sont écrasés.
 • Les autres fichiers (PDF, images, etc.) ne sont pas envoyés.
+
+Mode delta (--delta) :
+• un manifeste local (.ftp_manifest.json) garde taille + sha256 de chaque
+  fichier envoyé ; seuls les fichiers nouveaux ou modifiés sont envoyés
+• les fichiers du manifeste supprimés en local sont supprimés côté FTP
+• --verify compare en plus avec l’état distant (MLSD, ou SIZE à défaut)
+
+Envoi parallèle (--sessions N) :
+• N sessions FTP authentifiées (mode passif) se partagent les fichiers
+• chaque fichier est réessayé (avec reconnexion) en cas d’erreur réseau
+• un récapitulatif du débit est affiché en fin de transfert
+
+Mesures (ORIS_TRACE=fichier.jsonl et/ou ORIS_TRACE_PROM=fichier.prom) :
+• durée et taille de chaque envoi (span ftp.upload, compteur ftp.bytes)
 """
 
+import argparse
+import hashlib
+import json
 import os
-from ftplib import FTP, error_perm
+import queue
+import threading
+import time
+from ftplib import FTP, error_perm, error_reply, error_temp
 from pathlib import PurePosixPath
-from typing import List
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from oris_python.tracing import configure_from_env, count, span
 
 # ── PARAMÈTRES DE CONNEXION ───────────────────────────────────────────────────
 HOST       = "kaizis.com"
@@ -18,34 +40,55 @@ USER       = "swann.williame"
 PASSWORD   = "swa74321"
 PORT       = 14148
 TIMEOUT    = 15  # secondes pour connecter
+RETRIES    = 3   # nouvelles tentatives par fichier (envoi parallèle)
 # ──────────────────────────────────────────────────────────────────────────────
 
 # ── CHEMINS ───────────────────────────────────────────────────────────────────
 LOCAL_DIR  = "sdk"  # dossier local à transférer (relatif au cwd)
 REMOTE_DIR = "/Reflex/www/doc_Reflex/1_Data/sdk"  # dossier racine distant
+MANIFEST   = ".ftp_manifest.json"  # état des fichiers déjà envoyés (mode delta)
 # ──────────────────────────────────────────────────────────────────────────────
 
 
-def ensure_remote_path(ftp: FTP, remote_path: str) -> None:
+def ensure_remote_path(ftp: FTP, remote_path: str, known: Optional[Set[str]] = None) -> None:
     """
     Garantit que `remote_path` existe côté serveur.
     Crée récursivement les dossiers manquants puis se positionne dedans.
+
+    `known` (facultatif) mémorise les dossiers dont l’existence est déjà
+    établie : un dossier connu ou existant coûte un seul `cwd`.
     """
+    if known is not None:
+        try:
+            ftp.cwd(remote_path)
+            known.add(remote_path)
+            return
+        except error_perm:
+            if remote_path in known:
+                raise
     ftp.cwd("/")  # on part de la racine
+    current = PurePosixPath("/")
     for part in PurePosixPath(remote_path).parts:
         if not part or part == "/":
             continue
+        current = current / part
         try:
             ftp.cwd(part)
         except error_perm:
             ftp.mkd(part)
             ftp.cwd(part)
+        if known is not None:
+            known.add(str(current))
 
 
 def upload_file(ftp: FTP, local_file: str, remote_filename: str) -> None:
     """Envoie un fichier en écrasant la version distante si elle existe."""
-    with open(local_file, "rb") as f:
+    with span("ftp.upload", detail=remote_filename) as s, open(local_file, "rb") as f:
         ftp.storbinary(f"STOR {remote_filename}", f)
+        size = f.tell()
+        s.set(bytes=size)
+    count("ftp.bytes", size)
+    count("ftp.files")
 
 
 def upload_directory(local_root: str, remote_root: str, ftp: FTP) -> None:
@@ -53,6 +96,7 @@ def upload_directory(local_root: str, remote_root: str, ftp: FTP) -> None:
     Parcourt récursivement local_root et envoie tous les *.oris
     sous remote_root (écrase les fichiers existants).
     """
+    known_dirs: Set[str] = set()
     for dirpath, _, filenames in os.walk(local_root):
         # Sous-chemin relatif (peut être ".")
         rel_path = os.path.relpath(dirpath, local_root)
@@ -69,7 +113,7 @@ def upload_directory(local_root: str, remote_root: str, ftp: FTP) -> None:
             continue
 
         # S'assure que le dossier existe côté FTP
-        ensure_remote_path(ftp, remote_path)
+        ensure_remote_path(ftp, remote_path, known_dirs)
 
         # Envoie les fichiers *.oris
         for filename in oris_files:
@@ -78,23 +122,309 @@ def upload_directory(local_root: str, remote_root: str, ftp: FTP) -> None:
             upload_file(ftp, local_file, filename)
 
 
+def open_session() -> FTP:
+    """Ouvre une session FTP authentifiée, en mode passif."""
+    ftp = FTP()
+    ftp.connect(host=HOST, port=PORT, timeout=TIMEOUT)
+    ftp.login(user=USER, passwd=PASSWORD)
+    ftp.set_pasv(True)
+    return ftp
+
+
+# ── ENVOI PARALLÈLE ───────────────────────────────────────────────────────────
+# Un job = (clé, fichier local, chemin distant complet)
+Job = Tuple[str, str, str]
+
+
+def parallel_upload(jobs: List[Job], sessions: int, known_dirs: Optional[Set[str]] = None,
+                    on_done: Optional[Callable[[str], None]] = None,
+                    connect: Callable[[], FTP] = open_session,
+                    retries: int = RETRIES) -> Dict[str, object]:
+    """
+    Envoie `jobs` sur `sessions` connexions FTP en parallèle.
+
+    • la création des dossiers manquants est sérialisée (verrou partagé) et
+      mémorisée dans `known_dirs`, commun à toutes les sessions ;
+    • une erreur réseau/temporaire ferme la session, qui est rouverte pour
+      réessayer le fichier (jusqu’à `retries` fois, backoff exponentiel) ;
+    • `on_done(clé)` est appelé (sous verrou) pour chaque fichier envoyé ;
+    • une connexion refusée (error_perm, p. ex. 530 identifiants invalides)
+      arrête toutes les sessions : les fichiers restants sont comptés en
+      échec et l’erreur est relevée, au lieu d’une tentative de login par
+      fichier.
+    """
+    known_dirs = set() if known_dirs is None else known_dirs
+    todo: "queue.Queue[Job]" = queue.Queue()
+    for job in jobs:
+        todo.put(job)
+    lock = threading.Lock()
+    abort = threading.Event()
+    refused: List[error_perm] = []
+    stats: Dict[str, object] = {"sent": 0, "bytes": 0, "retries": 0, "failed": []}
+
+    def enter_dir(ftp: FTP, remote_dir: str) -> None:
+        if remote_dir in known_dirs:
+            ftp.cwd(remote_dir)
+            return
+        with lock:
+            ensure_remote_path(ftp, remote_dir, known_dirs)
+
+    def worker() -> None:
+        ftp, current_dir = None, None
+        while not abort.is_set():
+            try:
+                key, local_file, remote_file = todo.get_nowait()
+            except queue.Empty:
+                break
+            remote_dir, filename = remote_file.rsplit("/", 1)
+            for attempt in range(retries + 1):
+                try:
+                    if ftp is None:
+                        try:
+                            ftp, current_dir = connect(), None
+                        except error_perm as e:  # connexion refusée : inutile pour les autres fichiers
+                            with lock:
+                                stats["failed"].append(key)
+                                if not abort.is_set():
+                                    refused.append(e)
+                                    abort.set()
+                            return
+                    if remote_dir != current_dir:
+                        enter_dir(ftp, remote_dir)
+                        current_dir = remote_dir
+                    upload_file(ftp, local_file, filename)
+                    print(f"→ {local_file}  ⇒  {remote_file}")
+                    with lock:
+                        stats["sent"] += 1
+                        stats["bytes"] += os.path.getsize(local_file)
+                        if on_done:
+                            on_done(key)
+                    break
+                except error_perm as e:  # erreur définitive : inutile de réessayer
+                    print(f"[FTP] {remote_file} : {e}")
+                    with lock:
+                        stats["failed"].append(key)
+                    break
+                except (error_temp, error_reply, OSError, EOFError) as e:
+                    if ftp is not None:
+                        try:
+                            ftp.close()
+                        except OSError:
+                            pass
+                    ftp = None
+                    if attempt == retries:
+                        print(f"[Réseau] {remote_file} : abandon après {retries + 1} essais ({e})")
+                        with lock:
+                            stats["failed"].append(key)
+                    else:
+                        with lock:
+                            stats["retries"] += 1
+                        time.sleep(0.5 * 2 ** attempt)
+        if ftp is not None:
+            try:
+                ftp.quit()
+            except (error_reply, error_temp, error_perm, OSError, EOFError):
+                ftp.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f"ftp-{n}") for n in range(max(1, min(sessions, len(jobs))))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats["seconds"] = time.perf_counter() - start
+    if refused:
+        while not todo.empty():
+            stats["failed"].append(todo.get_nowait()[0])
+        print(f"[FTP] Connexion refusée ({refused[0]}) : envoi interrompu, "
+              f"{len(stats['failed'])} fichier(s) non envoyé(s)")
+        raise refused[0]
+    return stats
+
+
+def throughput_summary(stats: Dict[str, object]) -> str:
+    seconds = max(stats["seconds"], 1e-9)
+    return (
+        f"{stats['sent']} fichier(s), {stats['bytes'] / 1024:.1f} Ko en {stats['seconds']:.2f} s "
+        f"({stats['sent'] / seconds:.1f} fichiers/s, {stats['bytes'] / 1024 / seconds:.1f} Ko/s), "
+        f"{stats['retries']} nouvelle(s) tentative(s), {len(stats['failed'])} échec(s)"
+    )
+
+
+# ── MODE DELTA ────────────────────────────────────────────────────────────────
+
+def file_state(path: str) -> Dict[str, object]:
+    """Taille + sha256 d’un fichier local."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return {"size": os.path.getsize(path), "sha256": h.hexdigest()}
+
+
+def load_manifest(target: str) -> Dict[str, dict]:
+    """Charge le manifeste ; vide s’il est absent ou concerne une autre cible."""
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("files", {}) if data.get("target") == target else {}
+
+
+def save_manifest(target: str, files: Dict[str, dict]) -> None:
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"target": target, "files": dict(sorted(files.items()))}, f, indent=2)
+    os.replace(tmp, MANIFEST)
+
+
+def remote_sizes(ftp: FTP, remote_dir: str) -> Dict[str, int]:
+    """
+    Tailles des fichiers d’un dossier distant : un seul MLSD si le serveur le
+    gère, sinon un SIZE par fichier .oris listé par NLST.
+    """
+    try:
+        return {
+            name: int(facts["size"])
+            for name, facts in ftp.mlsd(remote_dir, facts=["type", "size"])
+            if facts.get("type") == "file" and "size" in facts
+        }
+    except error_perm:
+        pass
+    sizes = {}
+    ftp.voidcmd("TYPE I")  # SIZE n’est fiable qu’en binaire
+    try:
+        names = ftp.nlst(remote_dir)
+    except error_perm:
+        return sizes  # dossier absent ou vide
+    for name in names:
+        base = PurePosixPath(name).name
+        if not base.lower().endswith(".oris"):
+            continue
+        try:
+            sizes[base] = ftp.size(f"{remote_dir}/{base}")
+        except error_perm:
+            pass
+    return sizes
+
+
+def local_oris_files(local_root: str) -> Dict[str, str]:
+    """{chemin relatif posix: chemin local} des *.oris de local_root."""
+    files = {}
+    for dirpath, _, filenames in os.walk(local_root):
+        for fn in filenames:
+            if fn.lower().endswith(".oris"):
+                local_file = os.path.join(dirpath, fn)
+                files[os.path.relpath(local_file, local_root).replace(os.sep, "/")] = local_file
+    return files
+
+
+def sync_directory(local_root: str, remote_root: str, ftp: FTP, manifest: Dict[str, dict],
+                   verify: bool = False, known_dirs: Optional[Set[str]] = None,
+                   sessions: int = 1, connect: Callable[[], FTP] = open_session) -> Dict[str, int]:
+    """
+    Envoie les *.oris nouveaux/modifiés depuis le dernier envoi (manifeste),
+    supprime côté FTP ceux supprimés en local. `manifest` est mis à jour au fil
+    de l’eau. Avec `verify`, l’état distant (taille) est aussi contrôlé.
+    Avec `sessions` > 1, les envois passent par `parallel_upload`.
+    """
+    known_dirs = set() if known_dirs is None else known_dirs
+    stats = {"sent": 0, "unchanged": 0, "deleted": 0, "bytes": 0}
+    local = local_oris_files(local_root)
+    listings: Dict[str, Dict[str, int]] = {}
+    current_dir = None
+    pending: Dict[str, dict] = {}
+
+    for rel in sorted(local):
+        local_file = local[rel]
+        state = file_state(local_file)
+        remote_file = f"{remote_root}/{rel}"
+        remote_dir, filename = remote_file.rsplit("/", 1)
+        changed = manifest.get(rel) != state
+        if not changed and verify:
+            if remote_dir not in listings:
+                listings[remote_dir] = remote_sizes(ftp, remote_dir)
+            changed = listings[remote_dir].get(filename) != state["size"]
+        if not changed:
+            stats["unchanged"] += 1
+            continue
+        if sessions > 1:
+            pending[rel] = state
+            continue
+        if remote_dir != current_dir:
+            ensure_remote_path(ftp, remote_dir, known_dirs)
+            current_dir = remote_dir
+        print(f"→ {local_file}  ⇒  {remote_file}")
+        upload_file(ftp, local_file, filename)
+        manifest[rel] = state
+        stats["sent"] += 1
+        stats["bytes"] += state["size"]
+
+    if pending:
+        jobs = [(rel, local[rel], f"{remote_root}/{rel}") for rel in sorted(pending)]
+        result = parallel_upload(jobs, sessions, known_dirs, connect=connect,
+                                 on_done=lambda rel: manifest.__setitem__(rel, pending[rel]))
+        print(throughput_summary(result))
+        stats["sent"] += result["sent"]
+        stats["bytes"] += result["bytes"]
+
+    for rel in sorted(set(manifest) - set(local)):
+        remote_file = f"{remote_root}/{rel}"
+        try:
+            ftp.delete(remote_file)
+            print(f"✗ {remote_file} (supprimé en local)")
+            stats["deleted"] += 1
+        except error_perm as e:
+            if not str(e).startswith("550"):  # 550 : déjà absent
+                raise
+        del manifest[rel]
+    return stats
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Envoie les *.oris de ./sdk sur le FTP")
+    parser.add_argument("--delta", action="store_true",
+                        help="n’envoie que les fichiers modifiés depuis le dernier envoi")
+    parser.add_argument("--verify", action="store_true",
+                        help="(delta) contrôle aussi la taille des fichiers distants")
+    parser.add_argument("--sessions", type=int, default=1, metavar="N",
+                        help="nombre de sessions FTP parallèles pour les envois")
+    args = parser.parse_args()
+    configure_from_env()
+
     if not os.path.isdir(LOCAL_DIR):
         print(f"[ERREUR] Dossier local '{LOCAL_DIR}' introuvable.")
         return
 
     try:
-        ftp = FTP()
         print(f"Connexion à {HOST}:{PORT} …")
-        ftp.connect(host=HOST, port=PORT, timeout=TIMEOUT)
-        ftp.login(user=USER, passwd=PASSWORD)
-        ftp.set_pasv(True)
+        ftp = open_session()
 
-        print(
-            f"Synchronisation des fichiers *.oris de '{LOCAL_DIR}' → '{REMOTE_DIR}' "
-            "(les fichiers existants seront remplacés)…"
-        )
-        upload_directory(LOCAL_DIR, REMOTE_DIR, ftp)
+        if args.delta:
+            target = f"{HOST}:{PORT}{REMOTE_DIR}"
+            manifest = load_manifest(target)
+            print(f"Synchronisation delta de '{LOCAL_DIR}' → '{REMOTE_DIR}' …")
+            try:
+                stats = sync_directory(LOCAL_DIR, REMOTE_DIR, ftp, manifest,
+                                       verify=args.verify, sessions=args.sessions)
+            finally:
+                save_manifest(target, manifest)
+            print(
+                f"{stats['sent']} envoyé(s) ({stats['bytes']} octets), "
+                f"{stats['unchanged']} inchangé(s), {stats['deleted']} supprimé(s)."
+            )
+        else:
+            print(
+                f"Synchronisation des fichiers *.oris de '{LOCAL_DIR}' → '{REMOTE_DIR}' "
+                "(les fichiers existants seront remplacés)…"
+            )
+            if args.sessions > 1:
+                jobs = [(rel, path, f"{REMOTE_DIR}/{rel}")
+                        for rel, path in sorted(local_oris_files(LOCAL_DIR).items())]
+                print(throughput_summary(parallel_upload(jobs, args.sessions)))
+            else:
+                upload_directory(LOCAL_DIR, REMOTE_DIR, ftp)
 
         print("Transfert terminé, fermeture de la session.")
         ftp.quit()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Émulateur local des blocs fsdk_* d’un .oris, sur les données bd/*.000.
+
+Permet d’exécuter un endpoint de sdk/** sans serveur Oris et de mesurer ce
+qu’il coûte : pour chaque étape, lignes parcourues et lignes renvoyées.
+
+Interprété :
+  • fsdk_read(path, masque, params)        → liste JSON des colonnes du masque
+  • fsdk_param(path, txt, _N_, params)     → valeurs de la colonne N, jointes par « $$ »
+  • fsdk_write(path, masque, params)       → nombre de lignes modifiées (mch{i})
+  • fsdk_new(path, masque, params)         → id de la ligne créée
+  • fwpa(=ftxt(nom=)& …) / &fpar("nom")    → variables et sortie
+Les autres constructions (freq, fdat, …) sont signalées et ignorées.
+
+Paramètres :
+  • $fpar("x")  → paramètre HTTP `x` ou variable produite par une étape
+  • 'x'         → valeur `x` du contexte (--ctx x=…), le texte x à défaut
+  • filtres     fils{i}=<op>&fil{i}=<valeur>[&fir{i}=<borne basse>]
+                op : =  <>  <  >  <=  >=  inc  exc  >?<   ;  « $$ » sépare
+                plusieurs valeurs (une seule doit correspondre)
+
+Les écritures restent en mémoire : les fichiers bd/ ne sont jamais modifiés.
+
+Index : à la première égalité sur une colonne, un index valeur → lignes est
+construit pour cette colonne et sert aux étapes (et exécutions) suivantes.
+Les lignes lues pour le construire sont comptées dans les « parcourues » de
+l’étape qui l’a construit (marquée « construit »).
+
+Exemple :
+    python oris_emulator.py sdk/agents/get_related_missions/multiple_requete.oris \\
+        -p state=1 --ctx id=3 --repeat 3
+"""
+
+import argparse, json, re, time
+from pathlib import Path
+
+from analyze_oris import parse_oris
+from bd_reader import BD_DIR, BdFile, data_path
+from create_scripts import SCHEMA, load_schema
+
+LIST_SEP = "$$"
+
+_TOKEN  = re.compile(r'"([^"]*)"|\$?fpar\(\s*"?([\w.-]+)"?\s*\)|&|\s+')
+_QUOTED = re.compile(r"'(.*)'", re.S)
+_DATE   = re.compile(r"(\d{2})/(\d{2})/(\d{4})(?:\s+(\d{2}):(\d{2})(?::(\d{2}))?)?")
+_FILKEY = re.compile(r"(fils|fil|fir|mch)(\d+)")
+
+# ───────────────────────────── paramètres ────────────────────────────────────
+def evaluate_params(text: str, params: dict) -> str:
+    """`="a="$fpar("x")&"&b"` → `a=<x>&b` ; un texte sans « = » initial est littéral."""
+    text = text.strip()
+    if not text.startswith("="):
+        return text
+    out, pos = [], 1
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m:
+            raise ValueError(f"Paramètres illisibles à partir de : {text[pos:pos + 30]!r}")
+        if m.group(1) is not None:
+            out.append(m.group(1))
+        elif m.group(2) is not None:
+            if m.group(2) not in params:
+                raise ValueError(f"Paramètre « {m.group(2)} » non fourni")
+            out.append(str(params[m.group(2)]))
+        pos = m.end()
+    return "".join(out)
+
+def parse_query(query: str, ctx: dict):
+    """Chaîne de paramètres évaluée → (filtres, valeurs mch).
+
+    filtres : {col: [op, [valeurs], borne_basse]} ; mch : {col: valeur}.
+    """
+    def value(v):
+        m = _QUOTED.fullmatch(v)
+        return str(ctx.get(m.group(1), m.group(1))) if m else v
+
+    filters, writes = {}, {}
+    for part in query.split("&"):
+        key, _, val = part.partition("=")
+        m = _FILKEY.fullmatch(key.strip())
+        if not m:
+            continue
+        kind, col = m.group(1), int(m.group(2))
+        if kind == "mch":
+            writes[col] = value(val)
+            continue
+        f = filters.setdefault(col, ["=", [""], None])
+        if kind == "fils":
+            f[0] = val or "="
+        elif kind == "fil":
+            f[1] = [value(v) for v in val.split(LIST_SEP)]
+        else:
+            f[2] = value(val)
+    return filters, writes
+
+def sort_key(v):
+    """Clé de comparaison : date jj/mm/aaaa, puis nombre (virgule décimale), puis texte."""
+    v = (v or "").strip()
+    m = _DATE.fullmatch(v)
+    if m:
+        d, mo, y, h, mi, s = (int(x or 0) for x in m.groups())
+        return (1, (y, mo, d, h, mi, s))
+    try:
+        return (0, float(v.replace(" ", "").replace(",", ".")))
+    except ValueError:
+        return (2, v)
+
+def matcher(op: str, values: list, low):
+    values = [v.strip() for v in values]
+    if op == "=":
+        wanted = set(values)
+        return lambda v: (v or "").strip() in wanted
+    if op == "<>":
+        wanted = set(values)
+        return lambda v: (v or "").strip() not in wanted
+    if op == "inc":
+        return lambda v: any(w.lower() in (v or "").lower() for w in values)
+    if op == "exc":
+        return lambda v: not any(w.lower() in (v or "").lower() for w in values)
+    if op == ">?<":
+        lo, hi = sort_key(low), sort_key(values[0])
+        return lambda v: lo <= sort_key(v) <= hi
+    compare = {"<": lambda a, b: a < b, ">": lambda a, b: a > b,
+               "<=": lambda a, b: a <= b, ">=": lambda a, b: a >= b}.get(op)
+    if compare is None:
+        raise ValueError(f"Opérateur de filtre « {op} » non pris en charge")
+    bound = sort_key(values[0])
+    return lambda v: compare(sort_key(v), bound)
+
+# ───────────────────────────── tables ────────────────────────────────────────
+class TableData:
+    """Table chargée colonne par colonne, avec index de hachage à la demande."""
+
+    def __init__(self, name: str, fields: list, bd: BdFile):
+        self.name, self.fields, self.bd = name, fields, bd
+        self.ids = list(bd.ids)
+        self.counter = max(bd.counter, max(self.ids, default=0) + 1)
+        self._cols = {}       # indice → liste de valeurs (une par ligne)
+        self.indexes = {}     # indice → {valeur: [positions]}
+        self.materialized = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self, idxs):
+        """Charge en une passe les colonnes pas encore en mémoire."""
+        missing = sorted(set(idxs) - set(self._cols))
+        if not missing or self.materialized:
+            return
+        cols = [[] for _ in missing]
+        for row in self.bd.columns(missing):
+            for c, v in zip(cols, row[1:]):
+                c.append(v)
+        self._cols.update(zip(missing, cols))
+
+    def column(self, idx: int) -> list:
+        self.load([idx])
+        return self._cols[idx]
+
+    def materialize(self):
+        """Toutes les colonnes en mémoire (avant la première écriture)."""
+        self.load(range(len(self.fields)))
+        self.materialized = True
+
+    def index(self, idx: int) -> dict:
+        if idx not in self.indexes:
+            ix = {}
+            for pos, v in enumerate(self.column(idx)):
+                ix.setdefault((v or "").strip(), []).append(pos)
+            self.indexes[idx] = ix
+        return self.indexes[idx]
+
+    def select(self, filters: dict, use_index: bool = True):
+        """Positions des lignes qui passent tous les filtres
+        → (positions, parcourues, index utilisé, index construit pour l’occasion)."""
+        candidates, used, built = None, None, False
+        if use_index:
+            for col, (op, values, _) in filters.items():
+                if op == "=":
+                    built = col not in self.indexes
+                    ix = self.index(col)
+                    candidates = sorted({p for v in values for p in ix.get(v.strip(), ())})
+                    used = col
+                    break
+        if candidates is None:
+            candidates = range(len(self))
+        scanned = len(candidates) + (len(self) if built else 0)  # construction = parcours complet
+        checks = [(self.column(col), matcher(*f)) for col, f in filters.items() if col != used]
+        rows = [p for p in candidates if all(test(col[p]) for col, test in checks)]
+        return rows, scanned, used, built
+
+    def update(self, positions, writes: dict):
+        self.materialize()
+        for col, val in writes.items():
+            for p in positions:
+                self._cols[col][p] = val
+            self.indexes.pop(col, None)
+
+    def append(self, writes: dict) -> int:
+        self.materialize()
+        rid, self.counter = self.counter, self.counter + 1
+        self.ids.append(rid)
+        for col in range(len(self.fields)):
+            self._cols[col].append(writes.get(col, ""))
+        self.indexes.clear()
+        return rid
+
+# ───────────────────────────── exécution ─────────────────────────────────────
+class Emulator:
+    """Exécute des .oris sur bd/ ; les tables et leurs index persistent entre exécutions."""
+
+    def __init__(self, schema=None, bd_dir: Path = None, ctx: dict = None, use_index: bool = True):
+        self.schema = schema or load_schema()
+        self.by_path = {t.path: t for t in self.schema.tables.values()}
+        self.bd_dir = bd_dir or BD_DIR
+        self.ctx = ctx or {}
+        self.use_index = use_index
+        self.tables = {}
+
+    def close(self):
+        for t in self.tables.values():
+            t.bd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def table(self, path: str) -> TableData:
+        if path not in self.tables:
+            if path not in self.by_path:
+                raise ValueError(f"Table « {path} » absente de schema.json")
+            t = self.by_path[path]
+            self.tables[path] = TableData(t.name, t.fields, BdFile(data_path(path, self.bd_dir), t.fields))
+        return self.tables[path]
+
+    def _step(self, step, env: dict):
+        table = self.table(step.path)
+        filters, writes = parse_query(evaluate_params(step.params, env), self.ctx)
+        stat = {"table": table.name, "scanned": 0, "returned": 0, "index": None, "index_built": False}
+        if step.kind == "fsdk_new":
+            stat["returned"] = 1
+            return str(table.append(writes)), stat
+
+        rows, stat["scanned"], used, stat["index_built"] = table.select(filters, self.use_index)
+        stat["returned"] = len(rows)
+        stat["index"] = table.fields[used] if used is not None else None
+        if step.kind == "fsdk_write":
+            table.update(rows, writes)
+            return str(len(rows)), stat
+        if step.kind == "fsdk_param":
+            col, seen = table.column(step.mask[0]), {}
+            for p in rows:
+                seen.setdefault(col[p], None)
+            return LIST_SEP.join(v for v in seen if v), stat
+        cols = [(table.fields[i], table.column(i)) for i in step.mask]
+        return json.dumps([{name: col[p] for name, col in cols} for p in rows], ensure_ascii=False), stat
+
+    def run(self, text: str, params: dict = None):
+        """Exécute un texte .oris → (sorties, statistiques par étape)."""
+        env, outputs, stats = dict(params or {}), [], []
+        for step in parse_oris(text):
+            start = time.perf_counter()
+            if step.kind == "output":
+                (var,) = step.consumes
+                outputs.append(env.get(var, ""))
+                continue
+            if step.kind not in ("fsdk_read", "fsdk_param", "fsdk_write", "fsdk_new"):
+                stats.append({"step": step.index, "kind": step.kind, "emulated": False})
+                continue
+            result, stat = self._step(step, env)
+            stat.update(step=step.index, kind=step.kind, output=step.output,
+                        ms=(time.perf_counter() - start) * 1000)
+            stats.append(stat)
+            if step.output:
+                env[step.output] = result
+            else:
+                outputs.append(result)
+        return outputs, stats
+
+    def run_file(self, path, params: dict = None):
+        return self.run(Path(path).read_text(encoding="utf-8", errors="replace"), params)
+
+# ───────────────────────────── CLI ───────────────────────────────────────────
+def _pairs(items) -> dict:
+    out = {}
+    for item in items or []:
+        key, sep, val = item.partition("=")
+        if not sep:
+            raise SystemExit(f"« {item} » : clé=valeur attendu")
+        out[key] = val
+    return out
+
+def print_stats(stats: list):
+    print(f"{'étape':>5}  {'bloc':<10} {'table':<22} {'parcourues':>10} {'renvoyées':>9}  {'ms':>7}  index")
+    for s in stats:
+        if not s.get("emulated", True):
+            print(f"{s['step']:>5}  {s['kind']:<10} (non émulé)")
+            continue
+        print(f"{s['step']:>5}  {s['kind']:<10} {s['table']:<22} {s['scanned']:>10} "
+              f"{s['returned']:>9}  {s['ms']:7.2f}  {s['index'] or '—'}"
+              + (" (construit)" if s.get("index_built") else ""))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exécute un .oris sur les données locales bd/")
+    parser.add_argument("oris", type=Path)
+    parser.add_argument("-p", "--param", action="append", metavar="NOM=VALEUR", help="paramètre HTTP ($fpar)")
+    parser.add_argument("--ctx", action="append", metavar="NOM=VALEUR", help="valeur d’un 'nom' littéral")
+    parser.add_argument("--repeat", type=int, default=1, help="exécutions (index conservés entre elles)")
+    parser.add_argument("--no-index", action="store_true", help="parcours complet pour chaque filtre")
+    parser.add_argument("--schema", type=Path, default=SCHEMA)
+    parser.add_argument("--bd", type=Path, default=BD_DIR)
+    args = parser.parse_args(argv)
+
+    with Emulator(load_schema(args.schema), args.bd, _pairs(args.ctx), not args.no_index) as emu:
+        for n in range(args.repeat):
+            outputs, stats = emu.run_file(args.oris, _pairs(args.param))
+            print(f"── exécution {n + 1}")
+            print_stats(stats)
+        print("── sorties")
+        for out in outputs:
+            print(out)
+
+if __name__ == "__main__":
+    main()
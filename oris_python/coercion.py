@@ -0,0 +1,90 @@
+import logging
+
+import pandas as pd
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M")
+FORMULE_SAMPLE = 200
+
+def _as_text(ser: pd.Series):
+    return ser.astype("string").str.strip()
+
+def parse_numbers(ser: pd.Series):
+    """French-formatted numbers ("1 234,5", "-" for zero) → Float64, in one vectorized pass.
+
+    Always a float dtype, even when a chunk only holds integers, so every
+    chunk of a table gets the same type.
+    """
+    txt = _as_text(ser)
+    txt = txt.mask(txt.eq("-").fillna(False), "0")
+    txt = txt.str.replace(r"\s", "", regex=True).str.replace(",", ".", regex=False)
+    return pd.to_numeric(txt, errors="coerce").astype("Float64")
+
+def parse_dates(ser: pd.Series):
+    """`dd/mm/yyyy` dates (optionally with a time) → datetime64, unparsable values → NaT.
+
+    Each explicit format is only tried on the values the previous ones left
+    unparsed, so the common case is a single pass without format guessing.
+    """
+    txt = _as_text(ser)
+    out = pd.to_datetime(txt, format=DATE_FORMATS[0], errors="coerce")
+    for fmt in DATE_FORMATS[1:]:
+        todo = out.isna() & txt.notna() & (txt != "")
+        if not todo.any():
+            break
+        out[todo] = pd.to_datetime(txt[todo], format=fmt, errors="coerce")
+    return out
+
+def parse_bools(ser: pd.Series):
+    """0/1 flags → nullable boolean: 0 is False, any other number True,
+    empty or non-numeric values stay <NA>."""
+    nums = pd.to_numeric(ser, errors="coerce")
+    return (nums != 0).astype("boolean").mask(nums.isna())
+
+def infer_formule(ser: pd.Series, sample: int = FORMULE_SAMPLE, kinds: dict = None):
+    """Type a `formule` column from a sample of its non-empty values, then parse it once.
+
+    With `kinds` (`FieldMeta.formule_kinds`) the type found for the first
+    chunk holding values is recorded and reused for the following chunks.
+    """
+    kind = kinds.get(ser.name) if kinds is not None else None
+    if kind is None:
+        txt = _as_text(ser)
+        probe = txt[txt.notna() & (txt != "")].head(sample)
+        if probe.empty:
+            return ser
+        if parse_numbers(probe).notna().all():
+            kind = "number"
+        elif parse_dates(probe).notna().all():
+            kind = "date"
+        else:
+            kind = "text"
+        if kinds is not None:
+            kind = kinds.setdefault(ser.name, kind)
+        logger.debug(f'Formule "{ser.name}" is {kind}')
+    if kind == "number":
+        return parse_numbers(ser)
+    if kind == "date":
+        return parse_dates(ser)
+    return ser
+
+def coerce_frame(df: pd.DataFrame, meta):
+    """Convert the columns of a raw Oris frame to the types declared in `meta` (FieldMeta)."""
+    for cols, parse, kwargs in (
+        (meta.dates, parse_dates, {}),
+        (meta.numbers, parse_numbers, {}),
+        (meta.bools, parse_bools, {}),
+        (meta.formules, infer_formule, {"kinds": meta.formule_kinds}),
+    ):
+        for col in cols:
+            if col in df:
+                with span("coerce.column", detail=col, kind=parse.__name__):
+                    df[col] = parse(df[col], **kwargs)
+    for col in meta.listes:
+        if col in df:
+            with span("coerce.column", detail=col, kind="category"):
+                df[col] = df[col].astype("category")
+    return df
@@ -0,0 +1,134 @@
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def snapshot_id(when: datetime = None):
+    """Partition name of a run, e.g. `20260117T021500.123456Z` (UTC, sortable).
+
+    Microseconds keep two exports started in the same second apart.
+    """
+    return (when or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%S.%fZ")
+
+def _arrow_schema(df: pd.DataFrame):
+    """Arrow schema of the first chunk, with 32-bit dictionary indices so later
+    chunks with more categories still fit, and all-empty columns as strings."""
+    schema = pa.Schema.from_pandas(df, preserve_index=True)
+    fields = []
+    for f in schema:
+        if pa.types.is_dictionary(f.type):
+            f = pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type), f.nullable)
+        elif pa.types.is_null(f.type):
+            f = pa.field(f.name, pa.large_string(), True)
+        fields.append(f)
+    return pa.schema(fields, metadata=schema.metadata)
+
+def _conform(df: pd.DataFrame, schema: pa.Schema):
+    """Cast the chunk columns the first chunk typed as text (e.g. a `formule`
+    column that was empty there) to strings, so every chunk fits `schema`."""
+    text = [
+        name for name in df.columns
+        if name in schema.names
+        and (pa.types.is_string(schema.field(name).type) or pa.types.is_large_string(schema.field(name).type))
+        and not pd.api.types.is_string_dtype(df[name])
+    ]
+    if not text:
+        return df
+    df = df.copy(deep=False)
+    for name in text:
+        df[name] = df[name].astype("string")
+    return df
+
+def export_table(frames, root, table: str, fmt: str = "parquet", compression: str = "zstd", snapshot: str = None):
+    """Write a table snapshot as a columnar file under `root/<table>/snapshot=<id>/`.
+
+    `frames` is a DataFrame or any iterable of DataFrame chunks (e.g.
+    `Oris.iter_db_as_dataframe`); chunks are appended as row groups /
+    record batches, so the table never has to fit in memory at once. Each
+    run gets its own `snapshot=` partition next to the previous ones, with a
+    `_schema.json` describing its columns.
+
+    Args:
+        frames (DataFrame | iterable): data to export
+        root (str | Path): export root directory
+        table (str): table name (partition directory)
+        fmt (str, optional): "parquet" or "arrow" (Arrow IPC file). Defaults to "parquet".
+        compression (str, optional): codec ("zstd", "lz4", "snappy" for parquet, None). Defaults to "zstd".
+        snapshot (str, optional): snapshot id. Defaults to the current UTC time.
+
+    Returns:
+        Path: the written file
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt!r}, expected one of {", ".join(FORMATS)}')
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    snapshot = snapshot or snapshot_id()
+    directory = Path(root) / table / f"snapshot={snapshot}"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"part-00000{FORMATS[fmt]}"
+    tmp = path.with_name(path.name + ".tmp")
+
+    writer, schema, rows = None, None, 0
+    try:
+        for df in frames:
+            if schema is None:
+                schema = _arrow_schema(df)
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(tmp, schema, compression=compression)
+                else:
+                    options = ipc.IpcWriteOptions(compression=compression)
+                    writer = ipc.new_file(str(tmp), schema, options=options)
+            batch = pa.Table.from_pandas(_conform(df, schema), schema=schema, preserve_index=True)
+            writer.write_table(batch)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    if schema is None:
+        logger.warning(f'{table}: nothing to export')
+        return None
+    tmp.replace(path)
+
+    (directory / "_schema.json").write_text(json.dumps({
+        "table": table,
+        "snapshot": snapshot,
+        "format": fmt,
+        "compression": compression,
+        "rows": rows,
+        "columns": [{"name": f.name, "type": str(f.type)} for f in schema],
+    }, indent=2), encoding="utf-8")
+    logger.info(f'{table}: {rows} rows exported to {path}')
+    return path
+
+def list_snapshots(root, table: str):
+    """Snapshot ids of `table`, oldest first."""
+    base = Path(root) / table
+    return sorted(p.name.split("=", 1)[1] for p in base.glob("snapshot=*") if (p / "_schema.json").exists())
+
+def read_snapshot(root, table: str, snapshot: str = None):
+    """Load a snapshot (the latest by default) as a pyarrow Table, memory-mapped."""
+    snapshot = snapshot or list_snapshots(root, table)[-1]
+    directory = Path(root) / table / f"snapshot={snapshot}"
+    meta = json.loads((directory / "_schema.json").read_text(encoding="utf-8"))
+    path = directory / f"part-00000{FORMATS[meta['format']]}"
+    if meta["format"] == "parquet":
+        return pq.read_table(path, memory_map=True)
+    # the map stays open as long as the returned table references it
+    return ipc.open_file(pa.memory_map(str(path))).read_all()
+
+def snapshot_writer(root, fmt: str = "parquet", compression: str = "zstd", snapshot: str = None):
+    """Sync writer exporting each table of a run into the same snapshot partition."""
+    snapshot = snapshot or snapshot_id()
+    def write(db: str, df):
+        export_table(df, root, f'os_{db.lower()}', fmt, compression, snapshot)
+    return write
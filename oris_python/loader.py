@@ -0,0 +1,63 @@
+import io
+import logging
+import time
+
+from sqlalchemy import text
+
+from tracing import count, span
+
+logger = logging.getLogger(__name__)
+
+NULL = "\\N"
+
+def quote_ident(connection, name: str):
+    return connection.dialect.identifier_preparer.quote(name)
+
+def copy_frame(connection, df, table: str, chunk_rows: int = 100000):
+    """Stream `df` into an existing `table` with `COPY ... FROM STDIN`.
+
+    Rows are serialised to an in-memory CSV buffer `chunk_rows` at a time, so
+    the buffer never holds more than one chunk. The index is not written.
+    Must run inside a transaction on `connection`.
+    """
+    cols = ", ".join(quote_ident(connection, c) for c in df.columns)
+    sql = f"COPY {quote_ident(connection, table)} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{NULL}')"
+    cursor = connection.connection.cursor()
+    try:
+        with span("load.copy", table=table) as s:
+            for start in range(0, len(df), chunk_rows):
+                buf = io.StringIO()
+                df.iloc[start:start + chunk_rows].to_csv(buf, index=False, header=False, na_rep=NULL)
+                buf.seek(0)
+                cursor.copy_expert(sql, buf)
+            s.set(rows=len(df))
+    finally:
+        cursor.close()
+    count("load.rows", len(df), loader="copy")
+
+def create_like(connection, df, table: str):
+    """(Re)create an empty `table` whose column types follow the frame dtypes."""
+    df.head(0).to_sql(table, connection, if_exists='replace', index=False)
+
+def copy_replace(connection, df, table: str, chunk_rows: int = 100000):
+    """Replace `table` with the content of `df` using COPY and a staging table.
+
+    The frame is loaded into `<table>__load`, then the old table is dropped
+    and the staging table renamed, in one transaction: readers see either
+    the previous or the new content, never a half-loaded table.
+    """
+    staging = f'{table}__load'
+    start = time.perf_counter()
+    with connection.begin():
+        create_like(connection, df, staging)
+        copy_frame(connection, df, staging, chunk_rows)
+        connection.execute(text(f"DROP TABLE IF EXISTS {quote_ident(connection, table)}"))
+        connection.execute(text(f"ALTER TABLE {quote_ident(connection, staging)} RENAME TO {quote_ident(connection, table)}"))
+    elapsed = time.perf_counter() - start
+    logger.info(f'{table}: {len(df)} rows copied in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):.0f} rows/s)')
+
+def copy_replace_table(connection, chunk_rows: int = 100000):
+    """Sync writer: full replace of `os_<table>` through `copy_replace`."""
+    def write(db: str, df):
+        copy_replace(connection, df, f'os_{db.lower()}', chunk_rows)
+    return write
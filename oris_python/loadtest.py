@@ -0,0 +1,139 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mock_server import MockOrisServer, synth_table
+
+logger = logging.getLogger(__name__)
+
+# sync_fetch: main.py's sync_tables with a no-op writer (fetch + typing only);
+# sync_load: the same with main.py's default COPY loader, only run with --dsn
+SCENARIOS = ("get_db_as_dataframe", "sync_fetch", "sync_load")
+
+def percentile(values, p: float):
+    """Nearest-rank percentile (p in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+def table_names(size: int, tables: int):
+    return [f"bench_{size}_{n}" for n in range(tables)]
+
+def peak_rss_mib():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def run_scenario(url: str, scenario: str, dbs, repeat: int, concurrency: int, queue_size: int, dsn: str = None):
+    """Run one scenario against the mock (in a fresh process, so its peak RSS is its own)."""
+    from oris import Oris
+    from sync import full_fetch, sync_tables
+
+    latencies, rows = [], 0
+    with Oris(url, verify_ssl=False) as client:
+        client.connect("loadtest", "loadtest")
+        start = time.perf_counter()
+        if scenario == "get_db_as_dataframe":
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                df = client.get_db_as_dataframe(dbs[0], f"loadtest/{dbs[0]}")
+                latencies.append(time.perf_counter() - t0)
+                rows += len(df)
+        else:
+            def timed_fetch(client, bdd):
+                t0 = time.perf_counter()
+                df = full_fetch(client, bdd)
+                latencies.append(time.perf_counter() - t0)
+                return df
+            bdds = [(db, f"loadtest/{db}", "no") for db in dbs]
+            connection = None
+            write = lambda db, df: None
+            if scenario == "sync_load":
+                from sqlalchemy import create_engine
+                from loader import copy_replace_table
+
+                connection = create_engine(dsn).connect()
+                write = copy_replace_table(connection)
+            try:
+                for _ in range(repeat):
+                    results = sync_tables(client, bdds, write, concurrency, queue_size, fetch=timed_fetch)
+                    failed = [db for db, res in results.items() if isinstance(res, Exception)]
+                    if failed:
+                        raise RuntimeError(f'Sync failed for: {", ".join(failed)}')
+                    rows += sum(results.values())
+            finally:
+                if connection is not None:
+                    connection.close()
+        seconds = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_s": rows / max(seconds, 1e-9),
+        "p50_s": percentile(latencies, 50),
+        "p99_s": percentile(latencies, 99),
+        "peak_rss_mib": peak_rss_mib(),
+    }
+
+def run(sizes, columns: int = 20, tables: int = 4, repeat: int = 5, concurrency: int = 4,
+        queue_size: int = 2, latency: float = 0.0, bandwidth: float = None, seed: int = 0, dsn: str = None):
+    """Serve synthetic tables of each size and run every scenario against them.
+
+    `sync_load` writes the `bench_*` tables (as `os_bench_*`) into the
+    PostgreSQL database `dsn` and is skipped without it.
+
+    Returns:
+        list: one result dict per (size, scenario)
+    """
+    data = {}
+    for size in sizes:
+        for n, db in enumerate(table_names(size, tables)):
+            data[db] = synth_table(size, columns, seed=seed + n)
+            data[db].body(f"{db.lower()}s")  # encode up front, outside the measurements
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with MockOrisServer(data, latency=latency, bandwidth=bandwidth) as server:
+        for size in sizes:
+            for scenario in SCENARIOS:
+                if scenario == "sync_load" and not dsn:
+                    continue
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    res = pool.submit(run_scenario, server.url, scenario, table_names(size, tables),
+                                      repeat, concurrency, queue_size, dsn).result()
+                res.update(size=size, scenario=scenario)
+                logger.info(f'{scenario} @ {size} rows: {res["rows_per_s"]:.0f} rows/s')
+                results.append(res)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the Oris client against the mock server")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="rows per table, comma-separated")
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--tables", type=int, default=4, help="tables per size for the sync scenario")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4, help="SYNC_CONCURRENCY")
+    parser.add_argument("--queue-size", type=int, default=2, help="SYNC_QUEUE_SIZE")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency per response (s)")
+    parser.add_argument("--bandwidth", type=float, default=None, help="server bytes/s per response")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dsn", help="SQLAlchemy URL of a scratch PostgreSQL database for the sync_load scenario")
+    parser.add_argument("--json", metavar="FILE", help="also write the results to FILE")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    results = run([int(s) for s in args.sizes.split(",")], args.columns, args.tables, args.repeat,
+                  args.concurrency, args.queue_size, args.latency, args.bandwidth, args.seed, args.dsn)
+    print(f'{"scenario":<20} {"rows":>9} {"rows/s":>10} {"p50 (s)":>9} {"p99 (s)":>9} {"peak RSS":>10}')
+    for r in results:
+        print(f'{r["scenario"]:<20} {r["size"]:>9} {r["rows_per_s"]:>10.0f} {r["p50_s"]:>9.3f} '
+              f'{r["p99_s"]:>9.3f} {r["peak_rss_mib"]:>7.0f} MiB')
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import logging
 from oris import Oris
+from loader import copy_replace_table
+from metadata import MetadataCache
+from tracing import configure_from_env
+from sync import (chain_writers, delta_fetcher, full_fetch, read_high_water_marks, replace_table,
+                  reset_high_water_mark, sync_tables, upsert_table)
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine
@@ -12,6 +17,7 @@ logger = logging.getLogger(__name__)
 def main():
     logging.basicConfig(filename='', level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
     load_dotenv()
+    configure_from_env()
     engine = create_engine(f'postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}/{os.getenv('DB')}')
     
     # Check connection
@@ -21,16 +27,48 @@ def main():
     except Exception as e:
         logger.error(f"Connection failed! Error: {e}")
 
+    # (db, db_path, archives[, high-water mark column for SYNC_MODE=incremental, "id" by default:
+    #  new rows only, a modification-date column also picks up edited rows])
     bdds = [
         ("Agency_Document", "doc_reflex/1_data/sdk/agency", "yes")
     ]
 
-    client = Oris(os.getenv('ORIS_URL'))
+    metadata = MetadataCache(
+        ttl=float(os.getenv('ORIS_METADATA_TTL', 24 * 3600)),
+        cache_dir=os.getenv('ORIS_METADATA_CACHE_DIR'),
+    )
+    client = Oris(os.getenv('ORIS_URL'), metadata_cache=metadata)
     client.connect(os.getenv('ORIS_USER'), os.getenv('ORIS_PASSWORD'))
 
-    for bdd in bdds:
-        df = client.get_db_as_dataframe(bdd[0], bdd[1], bdd[2])
-        df.to_sql(f'os_{bdd[0].lower()}', connection, if_exists='replace', index=False)
+    if os.getenv('SYNC_MODE', 'full') == 'incremental':
+        write, fetch = upsert_table(connection), delta_fetcher(read_high_water_marks(connection))
+    else:
+        load = replace_table(connection) if os.getenv('SYNC_LOADER', 'copy') == 'to_sql' else copy_replace_table(connection)
+        # the full replace drops `id` and its primary key: the next incremental run must start over
+        write, fetch = chain_writers(load, reset_high_water_mark(connection)), full_fetch
+
+    if os.getenv('EXPORT_DIR'):
+        from export import snapshot_writer  # needs pyarrow, only when exporting
+
+        # per-run columnar snapshot of what was loaded (the delta in incremental mode)
+        write = chain_writers(write, snapshot_writer(
+            os.getenv('EXPORT_DIR'),
+            fmt=os.getenv('EXPORT_FORMAT', 'parquet'),
+            compression=os.getenv('EXPORT_COMPRESSION', 'zstd'),
+        ))
+
+    results = sync_tables(
+        client,
+        bdds,
+        write,
+        concurrency=int(os.getenv('SYNC_CONCURRENCY', 4)),
+        queue_size=int(os.getenv('SYNC_QUEUE_SIZE', 2)),
+        fetch=fetch,
+    )
+    failed = [db for db, res in results.items() if isinstance(res, Exception)]
+    if failed:
+        logger.error(f'Sync failed for: {", ".join(failed)}')
+    logger.info(f'Oris requests: {client.stats.as_dict()}')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
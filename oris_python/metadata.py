@@ -0,0 +1,161 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class FieldMeta:
+    """Column naming and typing derived from an Oris `readparam` response."""
+    def __init__(self, params):
+        self.params = params
+        self.columns = {}
+        self.dates = []
+        self.numbers = []
+        self.bools = []
+        self.formules = []
+        self.listes = []
+        # formule column -> "number" | "date" | "text", fixed by the first chunk
+        # holding values so every chunk of a table gets the same dtype
+        self.formule_kinds = {}
+
+        for champ in params:
+            col_name = champ.get('name').lower().replace(" ", "_").replace("'","") + '_' +champ.get('id')
+            self.columns[champ.get('idrest')] = col_name
+            if(champ.get("type") == "date"):
+                self.dates.append(col_name)
+            if(champ.get("type") == "bool"):
+                self.bools.append(col_name)
+            if(champ.get("type") == "bcd" or champ.get("type") == "heure"):
+                self.numbers.append(col_name)
+            if(champ.get("type") == "formule"):
+                self.formules.append(col_name)
+            if(champ.get("type") == "liste"):
+                self.listes.append(col_name)
+
+        logger.debug(f'column indexes: {self.columns}')
+        logger.debug(f'date columns: {self.dates}')
+        logger.debug(f'number columns: {self.numbers}')
+        logger.debug(f'boolean columns: {self.bools}')
+        logger.debug(f'formule columns: {self.formules}')
+        logger.debug(f'liste columns: {self.listes}')
+
+class MetadataCache:
+    """Field metadata cache keyed by (db, db_path).
+
+    Entries live in an in-memory LRU of `maxsize` tables and, when `cache_dir`
+    is set, in one JSON file per table so they survive between runs. Entries
+    older than `ttl` seconds are ignored (and refetched by the client).
+    """
+    def __init__(self, ttl: float = 24 * 3600, maxsize: int = 128, cache_dir=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, db: str, db_path: str):
+        return self.cache_dir / (re.sub(r"[^\w.-]+", "_", f"{db}@{db_path}") + ".json")
+
+    def _files_of(self, db: str):
+        """Cache files of every path of `db` (file names alone are ambiguous)."""
+        for file in self.cache_dir.glob("*.json"):
+            try:
+                stored_db = json.loads(file.read_text(encoding="utf-8")).get("db")
+            except (ValueError, AttributeError):
+                continue
+            if stored_db == db:
+                yield file
+
+    def get(self, db: str, db_path: str):
+        """Return the cached FieldMeta, or None if missing or expired."""
+        key = (db, db_path)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+        if self.cache_dir and self._file(db, db_path).exists():
+            try:
+                stored = json.loads(self._file(db, db_path).read_text(encoding="utf-8"))
+                fetched_at, champs = stored["fetched_at"], stored["champs"]
+                fresh = now - fetched_at < self.ttl
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f'Ignoring unreadable metadata cache file {self._file(db, db_path)}')
+                return None
+            if fresh:
+                meta = FieldMeta(champs)
+                self._remember(key, fetched_at, meta)
+                return meta
+        return None
+
+    def put(self, db: str, db_path: str, params, fetched_at: float = None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        meta = FieldMeta(params)
+        self._remember((db, db_path), fetched_at, meta)
+        if self.cache_dir:
+            self._file(db, db_path).write_text(
+                json.dumps({"db": db, "db_path": db_path, "fetched_at": fetched_at, "champs": params}),
+                encoding="utf-8",
+            )
+        return meta
+
+    def _remember(self, key, fetched_at: float, meta: FieldMeta):
+        with self._lock:
+            self._entries[key] = (fetched_at, meta)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, db: str = None, db_path: str = None):
+        """Drop one table's entry, every path of `db` when `db_path` is None,
+        or every entry when `db` is None."""
+        def matches(key):
+            return db is None or (key[0] == db and (db_path is None or key[1] == db_path))
+
+        with self._lock:
+            keys = [k for k in self._entries if matches(k)]
+            for key in keys:
+                del self._entries[key]
+        if self.cache_dir:
+            if db is None:
+                files = self.cache_dir.glob("*.json")
+            elif db_path is None:
+                files = list(self._files_of(db))
+            else:
+                files = [self._file(db, db_path)]
+            for file in files:
+                file.unlink(missing_ok=True)
+
+def params_from_ini(ini_path, idrest_format: str):
+    """Build `readparam`-like field params from a local bd/*.ini `[CHAMPS]` section.
+
+    The .ini holds each field's index, name and type but not its REST id, so
+    `idrest` is built from `idrest_format` (e.g. "{name}" or "c{id}") and
+    must match what the server returns.
+    """
+    fields = {}
+    in_champs = False
+    for line in Path(ini_path).read_text(encoding="latin-1").splitlines():
+        if line.startswith("["):
+            in_champs = line.strip() == "[CHAMPS]"
+            continue
+        m = re.match(r"\s*(\d+)_(name|type)\s*=\s*(.*)", line) if in_champs else None
+        if m:
+            fields.setdefault(int(m.group(1)), {})[m.group(2)] = m.group(3).strip()
+    params = []
+    for idx, field in sorted(fields.items()):
+        champ = {"id": str(idx), "name": field.get("name", ""), "type": field.get("type", "")}
+        champ["idrest"] = idrest_format.format(**champ)
+        params.append(champ)
+    return params
+
+def seed_from_ini(cache: MetadataCache, db: str, db_path: str, ini_path, idrest_format: str):
+    """Seed `cache` for (db, db_path) from a bd/*.ini file (see `params_from_ini`)."""
+    return cache.put(db, db_path, params_from_ini(ini_path, idrest_format))
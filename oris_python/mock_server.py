@@ -0,0 +1,255 @@
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID = "mock0001"
+SYNTH_TYPES = ("txt_1L", "bcd", "date", "bool", "liste", "heure", "txt")
+
+class MockTable:
+    """A table served by the mock: `readparam` fields and REST records.
+
+    Records are keyed by `idrest` plus `id` and `tri`, like the real
+    `/rest/<db>s` payload. The full JSON body is encoded once and reused
+    until a write changes the records.
+    """
+    def __init__(self, champs, records):
+        self.champs = champs
+        self.records = records
+        self._body = None
+        self._lock = threading.Lock()
+        self._by_id = None
+
+    def insert(self, rows: list):
+        """Append `rows` with new ids; return one {"id"} item per row."""
+        with self._lock:
+            next_id = max((int(r["id"]) for r in self.records), default=0) + 1
+            items = []
+            for row in rows:
+                rid = str(next_id)
+                next_id += 1
+                self.records.append(dict(row, id=rid, tri=rid))
+                if self._by_id is not None:
+                    self._by_id[rid] = self.records[-1]
+                items.append({"id": rid})
+            self._body = None
+            return items
+
+    def update(self, rows: list):
+        """Update existing records by `id`; return one {"id"[, "error"]} item per row."""
+        with self._lock:
+            if self._by_id is None:
+                self._by_id = {r["id"]: r for r in self.records}
+            items = []
+            for row in rows:
+                record = self._by_id.get(str(row.get("id")))
+                if record is None:
+                    items.append({"id": row.get("id"), "error": "record not found"})
+                    continue
+                unknown = [k for k in row if k != "id" and k not in record]
+                if unknown:
+                    items.append({"id": row["id"], "error": f'unknown field(s) {", ".join(unknown)}'})
+                    continue
+                record.update(row)
+                items.append({"id": record["id"]})
+            self._body = None
+            return items
+
+    def body(self, key: str, offset: int = None, limit: int = None):
+        if offset is None and limit is None:
+            with self._lock:
+                if self._body is None:
+                    self._body = json.dumps({key: self.records}).encode("utf-8")
+                return self._body
+        start = offset or 0
+        end = start + limit if limit is not None else None
+        return json.dumps({key: self.records[start:end]}).encode("utf-8")
+
+def synth_table(rows: int, columns: int = 20, seed: int = 0):
+    """Synthetic table of `rows` records over `columns` fields cycling through the Oris types."""
+    rng = random.Random(seed)
+    champs = [
+        {"id": str(j), "name": f"col {j}", "type": SYNTH_TYPES[j % len(SYNTH_TYPES)], "idrest": f"c{j}"}
+        for j in range(columns)
+    ]
+    def value(kind, i):
+        if kind == "bcd":
+            return f"{rng.randint(0, 999999):,}".replace(",", " ") + f",{rng.randint(0, 99):02d}"
+        if kind == "heure":
+            return f"{rng.randint(0, 23)},{rng.choice((0, 25, 5, 75))}"
+        if kind == "date":
+            return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2015, 2026)}"
+        if kind == "bool":
+            return rng.choice(("0", "1"))
+        if kind == "liste":
+            return str(rng.randint(0, 3))
+        return f"value {i} {rng.getrandbits(32):08x}"
+    records = []
+    for i in range(1, rows + 1):
+        record = {"id": str(i), "tri": str(i)}
+        for champ in champs:
+            record[champ["idrest"]] = value(champ["type"], i)
+        records.append(record)
+    return MockTable(champs, records)
+
+def bd_table(base: str, repeat: int = 1, bd_dir=None):
+    """Table built from the repository's bd/<table>.ini + .000 files, repeated `repeat` times."""
+    root = Path(__file__).resolve().parent.parent
+    if str(root) not in sys.path:
+        sys.path.append(str(root))
+    from bd_reader import open_table
+    from create_scripts import load_schema
+    from metadata import params_from_ini
+
+    schema = load_schema()
+    ini = (Path(bd_dir) if bd_dir else root / "bd") / Path(schema.table(base).path).name
+    champs = params_from_ini(ini, "c{id}")
+    with open_table(base, schema, bd_dir) as t:
+        rows = [
+            {f"c{i}": rec.get(name) or "" for i, name in enumerate(t.fields)}
+            for rec in t.records()
+        ]
+    records = []
+    for _ in range(repeat):
+        for row in rows:
+            rid = str(len(records) + 1)
+            records.append(dict(row, id=rid, tri=rid))
+    return MockTable(champs, records)
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        step = 1 << 16
+        for start in range(0, len(body), step):
+            self.wfile.write(body[start:start + step])
+            if self.server.bandwidth:
+                time.sleep(min(step, len(body) - start) / self.server.bandwidth)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.server.requests += 1
+        if url.path == "/form0001":
+            self._send(200, f'<?xml version="1.0"?><oris id="{SESSION_ID}"/>'.encode(), "text/xml")
+            return
+        if url.path.startswith("/rest/"):
+            name = url.path[len("/rest/"):]
+            if query.get("readparam") == "true" and name in self.server.tables:
+                self._send(200, json.dumps({"champs": self.server.tables[name].champs}).encode("utf-8"))
+                return
+            if name.endswith("s") and name[:-1] in self.server.tables:
+                db = name[:-1]
+                offset = int(query["offset"]) if "offset" in query and self.server.paging else None
+                limit = int(query["limit"]) if "limit" in query and self.server.paging else None
+                self._send(200, self.server.tables[db].body(f"{db.lower()}s", offset, limit))
+                return
+        self._send(404, b'{"error": "not found"}')
+
+    def _write(self, method: str):
+        url = urlsplit(self.path)
+        self.server.requests += 1
+        name = url.path[len("/rest/"):] if url.path.startswith("/rest/") else ""
+        if not (name.endswith("s") and name[:-1] in self.server.tables):
+            self._send(404, b'{"error": "not found"}')
+            return
+        db = name[:-1]
+        key = f"{db.lower()}s"
+        try:
+            rows = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))[key]
+        except (ValueError, KeyError, TypeError):
+            self._send(400, b'{"error": "bad request"}')
+            return
+        table = self.server.tables[db]
+        items = table.insert(rows) if method == "POST" else table.update(rows)
+        self._send(200, json.dumps({key: items}).encode("utf-8"))
+
+    def do_POST(self):
+        self._write("POST")
+
+    def do_PUT(self):
+        self._write("PUT")
+
+class MockOrisServer(ThreadingHTTPServer):
+    """Local stand-in for the Oris endpoints used by `Oris` (connect, REST reads,
+    readparam, and POST/PUT writes in the format assumed by the experimental
+    `Oris.write_records`: the mock only mirrors that guess, it does not
+    validate it against the real server).
+
+    With `paging=False` the `offset`/`limit` parameters are ignored and the
+    whole table is returned, like a backend without paging support.
+    """
+    daemon_threads = True
+
+    def __init__(self, tables: dict, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, bandwidth: float = None,
+                 paging: bool = True):
+        super().__init__((host, port), MockHandler)
+        self.tables = tables
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.paging = paging
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread and return self."""
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-oris", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Oris REST server")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--rows", type=int, default=10000, help="rows per synthetic table")
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--tables", type=int, default=1, help="synthetic tables bench_0, bench_1...")
+    parser.add_argument("--bd", action="append", default=[], metavar="TABLE", help="serve a bd/*.000 table")
+    parser.add_argument("--repeat", type=int, default=1, help="copies of each bd table's records")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--bandwidth", type=float, default=None, help="bytes/s per response")
+    parser.add_argument("--no-paging", action="store_true", help="ignore offset/limit (full table every time)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    tables = {f"bench_{n}": synth_table(args.rows, args.columns, seed=n) for n in range(args.tables)}
+    tables.update({base: bd_table(base, args.repeat) for base in args.bd})
+    server = MockOrisServer(tables, "127.0.0.1", args.port, args.latency, args.bandwidth, not args.no_paging)
+    logger.info(f'Serving {", ".join(tables)} on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,140 +1,468 @@
-import logging
-import requests
-import xml.etree.ElementTree as ET
-import pandas as pd
-
-logger = logging.getLogger(__name__)
-
-def safe_to_numeric(ser: pd.Series):
-    try:
-        
-        tmp = ser.str.replace("-", "0")
-        tmp = tmp.str.replace(",", ".", regex=True)
-        tmp = pd.to_numeric(tmp, errors="coerce")
-        return tmp
-    except Exception as e:
-        logger.warning(f'{e} for {ser.name}')
-        return ser
-
-def infer_formule_type(ser: pd.Series):
-    try:
-        tmp = ser.str.replace(",", ".", regex=True)
-        tmp = pd.to_numeric(tmp)
-        logger.debug(f'Formule "{ser.name}" is numeric')
-        return tmp
-    except:
-        pass
-
-    try:
-        tmp = ser.str.replace(",", "").replace(".", "")
-        tmp = pd.to_datetime(tmp, dayfirst=True)
-        logger.debug(f'Formule "{ser.name}" is date')
-        return tmp
-    except:
-        logger.debug(f'Formule "{ser.name}" is string')
-        return ser
-    
-class Oris:
-    """Python client for Oris
-    """
-    def __init__(self, url="https://reflex.link", verify_ssl=True):
-        """Init Oris client
-
-        Args:
-            url (str, optional): URL to Oris. Defaults to "https://www.x-oris.com".
-            verify_ssl (bool, optional): verify if connection is secure. Defaults to True.
-        """
-        self._url = url
-        self._verify_ssl = verify_ssl
-        self._id = None
-
-    def connect(self, user: str, passwd: str):
-        """Connect to oris backend
-
-        Args:
-            user (str): username
-            passwd (str): password
-
-        Returns:
-            str: token id
-        """
-
-        response = requests.get(f"{self._url}/form0001?user={user}&pass={passwd}&xml=true", verify=self._verify_ssl)
-        root = ET.fromstring(response.text)
-        self._id = root.get("id")
-        if(self._id == None):
-            logger.warning(f'Unable to connect {user} to Oris')
-        else:
-            logger.info(f'{user} connected to Oris')
-
-    def get_db(self, db: str, db_path: str, archives = "no"):
-        headers = {
-            "User-Agent": "Python",
-            "Accept": "application/json",
-            "Content-Type": "application/json; charset=utf-8",
-            "X-Oris-Basepath": f"{self._url}/{self._id}/{db_path}",
-            "Referer": f"{self._url}/{self._id}"
-        }
-
-        response = requests.get(f"{self._url}/rest/{db}s?glob={archives}", headers=headers)
-        if(response.status_code == 200):
-            logger.info(f'{db} received')
-        else:
-            logger.error(f'Unable to get {db} at {db_path}')
-
-        return response.json().get(f'{db.lower()}s')
-    
-    def get_db_params(self, db: str, db_path: str):
-        headers = {
-            "User-Agent": "Python",
-            "Accept": "application/json",
-            "Content-Type": "application/json; charset=utf-8",
-            "X-Oris-Basepath": f"{self._url}/{self._id}/{db_path}",
-            "Referer": f"{self._url}/{self._id}/"
-        }
-
-        response = requests.get(f"{self._url}/rest/{db}?readparam=true", headers=headers)
-        if(response.status_code == 200):
-            logger.info(f'{db} parameters received')
-        else:
-            logger.error(f'Unable to get {db} parameters at {db_path}')
-
-        # logger.debug(params)
-        return response.json().get("champs")
-    
-    def get_db_as_dataframe(self, db: str, db_path: str, archives = "no"):
-        params = self.get_db_params(db, db_path)
-        
-        col_idx = {}
-        col_date_idx = []
-        col_number_idx = []
-        col_bool_idx = []
-        col_formule_idx = []
-        
-        for champ in params:
-            col_name = champ.get('name').lower().replace(" ", "_").replace("'","") + '_' +champ.get('id')
-            col_idx[champ.get('idrest')] = col_name
-            if(champ.get("type") == "date"):
-                col_date_idx.append(col_name)
-            if(champ.get("type") == "bool"):
-                col_bool_idx.append(col_name)
-            if(champ.get("type") == "bcd" or champ.get("type") == "heure"):
-                col_number_idx.append(col_name)
-            if(champ.get("type") == "formule"):
-                col_formule_idx.append(col_name)
-        
-        logger.debug(f'column indexes: {col_idx}')
-        logger.debug(f'date columns: {col_date_idx}')
-        logger.debug(f'number columns: {col_number_idx}')
-        logger.debug(f'boolean columns: {col_bool_idx}')
-        logger.debug(f'formule columns: {col_formule_idx}')
-
-        data = self.get_db(db, db_path, archives)
-        df = pd.DataFrame.from_records(data, index="id")
-        df.rename(columns=col_idx, inplace=True)
-        df.drop(columns=["tri"], inplace=True)
-        df[col_date_idx] = df[col_date_idx].replace(",", "").apply(lambda x: pd.to_datetime(x, errors="coerce", dayfirst=True))
-        df[col_bool_idx] = df[col_bool_idx].apply(pd.to_numeric, errors="coerce").astype(bool)
-        df[col_number_idx] = df[col_number_idx].apply(safe_to_numeric)
-        df[col_formule_idx] = df[col_formule_idx].apply(infer_formule_type)
-        return df
+import codecs
+import itertools
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import requests
+import xml.etree.ElementTree as ET
+import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from coercion import coerce_frame
+from metadata import MetadataCache
+from tracing import count, span
+
+logger = logging.getLogger(__name__)
+
+_WS = " \t\r\n"
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|["{}\[\]]')
+_SCALAR_END = re.compile(r"[,\]]")
+
+def _value_complete(buf: str, pos: int):
+    """Whether the JSON value starting at `pos` ends inside `buf` (brackets balanced
+    outside strings). Only used when a decode fails, to tell a record cut by a
+    chunk boundary from a malformed one."""
+    if buf[pos] not in "{[":
+        return _SCALAR_END.search(buf, pos) is not None
+    depth = 0
+    for m in _TOKEN.finditer(buf, pos):
+        token = m.group()
+        if token == '"':
+            return False  # unterminated string
+        if token in ("{", "["):
+            depth += 1
+        elif token in ("}", "]"):
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+def iter_json_array(chunks, key: str):
+    """Yield the objects of the top-level array `key` from a stream of byte chunks.
+
+    Only the current undecoded tail is kept in memory, so a response holding
+    millions of records is parsed with a footprint of roughly one record.
+    A malformed record raises `json.JSONDecodeError`; a body ending before
+    the array is closed raises `ValueError`, so a cut response is never
+    mistaken for a complete table.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, in_array = "", 0, False
+    marker = f'"{key}"'
+    for chunk in chunks:
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        if not in_array:
+            start = buf.find(marker)
+            bracket = buf.find("[", start + len(marker)) if start >= 0 else -1
+            if bracket < 0:
+                continue
+            pos, in_array = bracket + 1, True
+        while True:
+            while pos < len(buf) and buf[pos] in _WS + ",":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if _value_complete(buf, pos):
+                    raise
+                break  # incomplete record, wait for the next chunk
+            yield obj
+            pos = end
+    buf = buf[pos:] + utf8.decode(b"", final=True)
+    if in_array:
+        raise ValueError(f'Truncated JSON response: array "{key}" not closed ({len(buf)} trailing characters)')
+    json.loads(buf)  # an empty or cut body raises here; a complete one without `key` has no records
+    logger.warning(f'No "{key}" array in the response')
+
+def _counted(chunks, endpoint: str):
+    """Pass byte chunks through, adding their size to the `client.bytes` counter."""
+    for chunk in chunks:
+        count("client.bytes", len(chunk), endpoint=endpoint)
+        yield chunk
+
+class LatencyStats:
+    """Per-endpoint request counters (count, errors, total/max latency), thread-safe."""
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, elapsed: float, ok: bool):
+        with self._lock:
+            st = self._stats.setdefault(endpoint, {"count": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            st["count"] += 1
+            st["errors"] += 0 if ok else 1
+            st["total_s"] += elapsed
+            st["max_s"] = max(st["max_s"], elapsed)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                endpoint: dict(st, mean_s=st["total_s"] / st["count"])
+                for endpoint, st in self._stats.items()
+            }
+
+class Oris:
+    """Python client for Oris
+    """
+    def __init__(self, url="https://reflex.link", verify_ssl=True, pool_size=10, timeout=(5, 120), retries=3, backoff_factor=0.5, metadata_cache=None,
+                 experimental_writes=False):
+        """Init Oris client
+
+        All requests go through one pooled `requests.Session` (keep-alive), with
+        retries and exponential backoff on connection errors/resets and 5xx
+        responses.
+
+        Args:
+            url (str, optional): URL to Oris. Defaults to "https://www.x-oris.com".
+            verify_ssl (bool, optional): verify if connection is secure. Defaults to True.
+            pool_size (int, optional): max pooled connections per host. Defaults to 10.
+            timeout (float | tuple, optional): (connect, read) timeout in seconds. Defaults to (5, 120).
+            retries (int, optional): retries per request. Defaults to 3.
+            backoff_factor (float, optional): backoff between retries (0.5 → 0.5s, 1s, 2s...). Defaults to 0.5.
+            metadata_cache (MetadataCache, optional): field metadata cache. Defaults to an in-memory cache.
+            experimental_writes (bool, optional): enable `write_records` / `insert_records`. Defaults to False.
+        """
+        self._url = url
+        self._verify_ssl = verify_ssl
+        self._id = None
+        self._timeout = timeout
+        self.stats = LatencyStats()
+        self.metadata = metadata_cache if metadata_cache is not None else MetadataCache()
+        self.experimental_writes = experimental_writes
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get(self, endpoint: str, url: str, **kwargs):
+        """GET through the pooled session, recording latency under `endpoint`.
+
+        For streamed requests the latency is the time to response headers.
+        """
+        return self._request("GET", endpoint, url, **kwargs)
+
+    def _request(self, method: str, endpoint: str, url: str, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self._session.request(method, url, timeout=self._timeout, verify=self._verify_ssl, **kwargs)
+            ok = response.status_code < 400
+            if not kwargs.get("stream"):
+                count("client.bytes", len(response.content), endpoint=endpoint)
+            return response
+        finally:
+            self.stats.record(endpoint, time.perf_counter() - start, ok)
+            count("client.requests", endpoint=endpoint, ok=ok)
+
+    def connect(self, user: str, passwd: str):
+        """Connect to oris backend
+
+        Args:
+            user (str): username
+            passwd (str): password
+
+        Returns:
+            str: token id
+        """
+
+        response = self._get("form0001", f"{self._url}/form0001?user={user}&pass={passwd}&xml=true")
+        root = ET.fromstring(response.text)
+        self._id = root.get("id")
+        if(self._id == None):
+            logger.warning(f'Unable to connect {user} to Oris')
+        else:
+            logger.info(f'{user} connected to Oris')
+
+    def _headers(self, db_path: str, referer: str = ""):
+        return {
+            "User-Agent": "Python",
+            "Accept": "application/json",
+            "Content-Type": "application/json; charset=utf-8",
+            "X-Oris-Basepath": f"{self._url}/{self._id}/{db_path}",
+            "Referer": f"{self._url}/{self._id}{referer}"
+        }
+
+    def get_db(self, db: str, db_path: str, archives = "no"):
+        response = self._get(f"rest/{db}s", f"{self._url}/rest/{db}s?glob={archives}", headers=self._headers(db_path))
+        if(response.status_code == 200):
+            logger.info(f'{db} received')
+        else:
+            logger.error(f'Unable to get {db} at {db_path}')
+
+        data = response.json().get(f'{db.lower()}s')
+        count("client.rows", len(data or ()), db=db)
+        return data
+
+    def iter_db(self, db: str, db_path: str, archives = "no", chunk_size: int = 10000, page_size: int = None):
+        """Stream the records of `db` and yield them in lists of `chunk_size`.
+
+        The body is parsed incrementally instead of through `response.json()`.
+        With `page_size`, records are requested page by page (`offset`/`limit`
+        query parameters). If the backend ignores them, paging stops: either
+        the first response holds more than `page_size` records, or a page
+        starts with the same id as the previous one (the full table was
+        returned again); that repeated page is discarded.
+
+        Args:
+            db (str): table name
+            db_path (str): table path
+            archives (str, optional): include archived records ("yes"/"no"). Defaults to "no".
+            chunk_size (int, optional): number of records per yielded list. Defaults to 10000.
+            page_size (int, optional): records per HTTP request. Defaults to None (single request).
+        """
+        key = f'{db.lower()}s'
+        offset = 0
+        chunk = []
+        first_id = None
+        while True:
+            url = f"{self._url}/rest/{db}s?glob={archives}"
+            if page_size:
+                url += f"&offset={offset}&limit={page_size}"
+            received, repeated = 0, False
+            with self._get(f"rest/{db}s", url, headers=self._headers(db_path), stream=True) as response:
+                if(response.status_code != 200):
+                    logger.error(f'Unable to get {db} at {db_path}')
+                    response.raise_for_status()
+                for record in iter_json_array(_counted(response.iter_content(chunk_size=1 << 16), f"rest/{db}s"), key):
+                    if received == 0 and page_size:
+                        page_id = record.get("id") if isinstance(record, dict) else None
+                        if offset and page_id is not None and page_id == first_id:
+                            logger.warning(f'{db}: the server ignores offset/limit, stopping at {offset} records')
+                            repeated = True
+                            break
+                        first_id = page_id
+                    chunk.append(record)
+                    received += 1
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+            if repeated:
+                break
+            logger.info(f'{db} received ({received} records from offset {offset})')
+            count("client.rows", received, db=db)
+            if not page_size or received < page_size or received > page_size:
+                break
+            offset += received
+        if chunk:
+            yield chunk
+
+    def get_db_params(self, db: str, db_path: str):
+        response = self._get(f"rest/{db}?readparam", f"{self._url}/rest/{db}?readparam=true", headers=self._headers(db_path, "/"))
+        if(response.status_code == 200):
+            logger.info(f'{db} parameters received')
+        else:
+            logger.error(f'Unable to get {db} parameters at {db_path}')
+
+        # logger.debug(params)
+        return response.json().get("champs")
+
+    def field_meta(self, db: str, db_path: str):
+        """Column naming/typing of `db`, from the metadata cache or `get_db_params`."""
+        meta = self.metadata.get(db, db_path)
+        if meta is None:
+            meta = self.metadata.put(db, db_path, self.get_db_params(db, db_path))
+        return meta
+
+    @staticmethod
+    def _to_dataframe(data, meta):
+        with span("client.to_dataframe") as s:
+            df = pd.DataFrame.from_records(data, index="id")
+            df.rename(columns=meta.columns, inplace=True)
+            df.drop(columns=["tri"], inplace=True)
+            s.set(rows=len(df))
+            return coerce_frame(df, meta)
+
+    def get_db_as_dataframe(self, db: str, db_path: str, archives = "no"):
+        meta = self.field_meta(db, db_path)
+        data = self.get_db(db, db_path, archives)
+        return self._to_dataframe(data, meta)
+
+    def iter_db_as_dataframe(self, db: str, db_path: str, archives = "no", chunk_size: int = 10000, page_size: int = None):
+        """Generator variant of `get_db_as_dataframe` yielding typed DataFrame chunks.
+
+        See `iter_db` for the streaming and paging arguments.
+        """
+        meta = self.field_meta(db, db_path)
+        for data in self.iter_db(db, db_path, archives, chunk_size, page_size):
+            yield self._to_dataframe(data, meta)
+
+    # ─── write-back ──────────────────────────────────────────────────────────
+
+    def insert_records(self, db: str, db_path: str, records, chunk_size: int = 500, max_in_flight: int = 4):
+        """Create records in `db` in batches (see `write_records`); records must not carry an `id`."""
+        return self._send_records("POST", db, db_path, records, chunk_size, max_in_flight)
+
+    def write_records(self, db: str, db_path: str, records, chunk_size: int = 500, max_in_flight: int = 4):
+        """Update existing records of `db` in batches (experimental).
+
+        The REST write protocol below is assumed, not a documented Oris
+        endpoint (the repository's own writes go through fsdk_write /
+        fsdk_new scripts): it is only enabled with `Oris(...,
+        experimental_writes=True)`, and should be checked against the
+        server before use.
+
+        `records` is a DataFrame (as returned by `get_db_as_dataframe`, the
+        `id` index or column identifies each record) or an iterable of dicts.
+        Columns use the DataFrame names (`<name>_<id>`) or the raw `idrest`
+        ids; they are mapped back to `idrest` with the cached field metadata
+        and typed values are formatted back to Oris text (`bd_writer.to_oris`).
+
+        Rows are grouped in chunks of `chunk_size`, each sent as one JSON
+        request to `/rest/<db>s` (`{"<db>s": [records]}`; PUT for updates,
+        POST for inserts), with at most `max_in_flight` requests at once.
+        The per-row outcome comes from the `<db>s` list of the response
+        (one item per sent row: `error` key, returned `id`). An error status
+        or a failed request marks the whole chunk as failed; a 2xx response
+        without such a list is not taken as proof of a write, its rows get
+        `ok=None` (unknown outcome). Writes are not retried.
+
+        Args:
+            db (str): table name
+            db_path (str): table path
+            records (DataFrame | iterable): rows to write
+            chunk_size (int, optional): rows per request. Defaults to 500.
+            max_in_flight (int, optional): concurrent requests. Defaults to 4.
+
+        Returns:
+            list: one {"row", "id", "ok", "error"} dict per input row, in input order;
+                `ok` is True, False or None (unknown outcome)
+        """
+        return self._send_records("PUT", db, db_path, records, chunk_size, max_in_flight)
+
+    def _send_records(self, method: str, db: str, db_path: str, records, chunk_size: int, max_in_flight: int):
+        if not self.experimental_writes:
+            raise RuntimeError("REST writes are experimental (assumed protocol): "
+                               "create the client with experimental_writes=True to use them")
+        root = Path(__file__).resolve().parent.parent
+        if str(root) not in sys.path:
+            sys.path.append(str(root))
+        from bd_writer import to_oris
+
+        meta = self.field_meta(db, db_path)
+        to_rest = {col: idrest for idrest, col in meta.columns.items()}
+        to_rest.update((idrest, idrest) for idrest in meta.columns)
+        types = {champ.get("idrest"): champ.get("type", "") for champ in meta.params}
+        kinds = {col: types.get(idrest, "") for col, idrest in to_rest.items()}
+
+        if isinstance(records, pd.DataFrame):
+            df = records.reset_index() if records.index.name == "id" else records
+            unknown = [c for c in df.columns if c != "id" and c not in to_rest]
+            if unknown:
+                raise ValueError(f'Unknown column(s) for {db}: {", ".join(map(str, unknown))}')
+            columns = list(df.columns)
+            records = (dict(zip(columns, values)) for values in df.itertuples(index=False, name=None))
+
+        def payload(row: dict):
+            out = {}
+            for col, value in row.items():
+                if col == "id":
+                    if method == "PUT":
+                        out["id"] = to_oris(value)
+                    continue
+                if col not in to_rest:
+                    raise ValueError(f'Unknown column {col!r}')
+                out[to_rest[col]] = to_oris(value, kinds.get(col, ""))
+            if method == "PUT" and not out.get("id"):
+                raise ValueError("Missing record id")
+            return out
+
+        key = f'{db.lower()}s'
+        url = f"{self._url}/rest/{db}s"
+        results = {}
+        slots = threading.BoundedSemaphore(max(1, max_in_flight) * 2)  # chunks built ahead of the senders
+
+        def send(start: int, chunk: list):
+            try:
+                body, sent = [], []
+                for n, row in enumerate(chunk, start):
+                    try:
+                        body.append(payload(row))
+                        sent.append(n)
+                    except (ValueError, TypeError) as e:
+                        results[n] = {"row": n, "id": row.get("id"), "ok": False, "error": str(e)}
+                if body:
+                    self._send_chunk(method, db, db_path, url, key, body, sent, results)
+            finally:
+                slots.release()
+
+        futures = []
+        with ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="oris-write") as pool:
+            rows = iter(records)
+            start = 0
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+                slots.acquire()
+                futures.append(pool.submit(send, start, chunk))
+                start += len(chunk)
+        for future in futures:
+            future.result()  # re-raise unexpected errors from the senders
+
+        written = sum(1 for r in results.values() if r["ok"] is True)
+        unknown = sum(1 for r in results.values() if r["ok"] is None)
+        level = logging.WARNING if written < len(results) else logging.INFO
+        logger.log(level, f'{db}: {written}/{len(results)} rows written, {unknown} unknown ({method})')
+        return [results[n] for n in range(start)]
+
+    def _send_chunk(self, method: str, db: str, db_path: str, url: str, key: str, body: list, rows: list, results: dict):
+        with span("client.write_chunk", db=db, method=method) as s:
+            s.set(rows=len(body))
+            try:
+                response = self._request(method, f"rest/{db}s", url, headers=self._headers(db_path),
+                                         data=json.dumps({key: body}).encode("utf-8"))
+            except requests.RequestException as e:
+                # a read timeout happens after the request was sent: it may have been applied
+                outcome = [(None if isinstance(e, requests.ReadTimeout) else False, None, str(e))] * len(body)
+            else:
+                if response.status_code >= 400:
+                    outcome = [(False, None, f"HTTP {response.status_code}")] * len(body)
+                else:
+                    try:
+                        items = response.json().get(key)
+                    except (ValueError, AttributeError):
+                        items = None
+                    if isinstance(items, list) and len(items) == len(body) and all(isinstance(i, dict) for i in items):
+                        outcome = [(not item.get("error"), item.get("id"), item.get("error")) for item in items]
+                    else:
+                        logger.warning(f'{db}: unrecognised write response (HTTP {response.status_code}), outcome unknown')
+                        outcome = [(None, None, f"unknown outcome: no {key} list in the response")] * len(body)
+        for n, sent, (ok, rid, error) in zip(rows, body, outcome):
+            results[n] = {"row": n, "id": rid or sent.get("id"), "ok": ok, "error": error}
+        for ok in (True, False, None):
+            n = sum(1 for o, _, _ in outcome if o is ok)
+            if n:
+                count("client.rows_written", n, db=db, ok="unknown" if ok is None else ok)
@@ -0,0 +1,220 @@
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from loader import quote_ident, copy_frame, create_like
+from tracing import count, span
+
+logger = logging.getLogger(__name__)
+
+STATE_TABLE = "os_sync_state"
+
+def replace_table(connection):
+    """Default writer: full replace of `os_<table>` with `DataFrame.to_sql`."""
+    def write(db: str, df):
+        with span("load.to_sql", table=f'os_{db.lower()}') as s:
+            df.to_sql(f'os_{db.lower()}', connection, if_exists='replace', index=False)
+            s.set(rows=len(df))
+        count("load.rows", len(df), loader="to_sql")
+    return write
+
+def chain_writers(*writers):
+    """Writer calling each of `writers` in turn (e.g. load into PostgreSQL, then export)."""
+    def write(db: str, df):
+        for writer in writers:
+            writer(db, df)
+    return write
+
+def full_fetch(client, bdd):
+    """Default fetcher: the whole table through `get_db_as_dataframe`."""
+    db, db_path, archives = bdd[:3]
+    return client.get_db_as_dataframe(db, db_path, archives)
+
+def sync_tables(client, bdds, write, concurrency: int = 4, queue_size: int = 2, fetch=full_fetch):
+    """Fetch several Oris tables in parallel and write them one at a time.
+
+    Up to `concurrency` tables are downloaded and typed concurrently by a
+    thread pool. Fetched frames go through a bounded queue of `queue_size`
+    entries to a single writer running in the calling thread, so the
+    database connection is never shared between threads and fetchers block
+    instead of piling frames up in memory when PostgreSQL is the bottleneck.
+
+    Args:
+        client (Oris): connected client
+        bdds (list): (db, db_path, archives[, hwm_column]) tuples
+        write (callable): `write(db, df)` called for each fetched table
+        concurrency (int, optional): tables fetched at once. Defaults to 4.
+        queue_size (int, optional): fetched tables waiting for the writer. Defaults to 2.
+        fetch (callable, optional): `fetch(client, bdd)` returning the frame to write. Defaults to full_fetch.
+
+    Returns:
+        dict: db -> number of rows written, or the exception raised for that table
+    """
+    frames = queue.Queue(maxsize=max(1, queue_size))
+
+    def fetch_one(bdd):
+        db = bdd[0]
+        start = time.perf_counter()
+        try:
+            with span("sync.fetch", db=db):
+                df = fetch(client, bdd)
+            logger.info(f'{db} fetched in {time.perf_counter() - start:.2f}s ({len(df)} rows)')
+            frames.put((db, df))
+        except Exception as e:
+            logger.error(f'Unable to fetch {db}: {e}')
+            frames.put((db, e))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="oris-fetch") as pool:
+        for bdd in bdds:
+            pool.submit(fetch_one, bdd)
+        for _ in range(len(bdds)):
+            db, df = frames.get()
+            if isinstance(df, Exception):
+                results[db] = df
+                continue
+            start = time.perf_counter()
+            try:
+                with span("sync.write", db=db):
+                    write(db, df)
+                results[db] = len(df)
+                logger.info(f'{db} written in {time.perf_counter() - start:.2f}s')
+            except Exception as e:
+                logger.error(f'Unable to write {db}: {e}')
+                results[db] = e
+    return results
+
+# ─── incremental sync ────────────────────────────────────────────────────────
+
+def read_high_water_marks(connection):
+    """Return {db: (hwm_column, hwm)} from the sync state table (created if missing)."""
+    with connection.begin():
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {STATE_TABLE} ("
+            "table_name TEXT PRIMARY KEY, hwm_column TEXT NOT NULL, hwm TEXT, "
+            "updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        rows = connection.execute(text(f"SELECT table_name, hwm_column, hwm FROM {STATE_TABLE}"))
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+def reset_high_water_mark(connection):
+    """Writer deleting a table's high-water mark, chained after full-mode writers.
+
+    A full replace recreates `os_<table>` without the `id` column and primary
+    key the upsert relies on, so the next incremental run must reload the
+    table in full instead of merging a delta into it.
+    """
+    def write(db: str, df):
+        with _begin(connection):
+            _delete_mark(connection, db)
+    return write
+
+def _begin(connection):
+    """`connection.begin()`, first committing the transaction SQLAlchemy 2.x
+    opens implicitly on any statement run outside one (e.g. `to_sql`)."""
+    if connection.in_transaction():
+        connection.commit()
+    return connection.begin()
+
+def _delete_mark(connection, db: str):
+    if inspect(connection).has_table(STATE_TABLE):
+        connection.execute(text(f"DELETE FROM {STATE_TABLE} WHERE table_name = :t"), {"t": db})
+
+def _has_id_key(connection, table: str):
+    return inspect(connection).get_pk_constraint(table).get("constrained_columns") == ["id"]
+
+def _newer(ser: pd.Series, hwm: str):
+    """Rows strictly after an id mark, or on/after a date mark (dates are day precision)."""
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        return ser >= pd.Timestamp(hwm)
+    return pd.to_numeric(ser, errors="coerce") > float(hwm)
+
+def _hwm_of(ser: pd.Series):
+    if ser.empty:
+        return None
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        top = ser.max()
+        return None if pd.isna(top) else top.isoformat()
+    top = pd.to_numeric(ser, errors="coerce").max()
+    return None if pd.isna(top) else repr(top.item() if hasattr(top, "item") else top)
+
+def delta_fetcher(marks: dict, chunk_size: int = 10000):
+    """Fetcher keeping only rows past each table's high-water mark.
+
+    The table is streamed with `iter_db_as_dataframe` and filtered chunk by
+    chunk, so only the rows past the mark are kept in memory. With the
+    default `id` mark that means new rows only: records edited since the
+    last run are not picked up. Use a modification-date column as the mark
+    to also fetch changed rows. Tables without a recorded mark are fetched
+    in full (first run). The record id is kept as an `id` column for the upsert.
+    """
+    def fetch(client, bdd):
+        db, db_path, archives = bdd[:3]
+        column = bdd[3] if len(bdd) > 3 else "id"
+        hwm = marks.get(db, (column, None))[1]
+        parts = []
+        for df in client.iter_db_as_dataframe(db, db_path, archives, chunk_size=chunk_size):
+            df = df.reset_index()
+            if hwm is not None:
+                df = df[_newer(df[column], hwm)]
+            if not df.empty:
+                parts.append(df)
+        df = pd.concat(parts) if parts else pd.DataFrame(columns=["id"])
+        df.attrs["full"] = hwm is None
+        df.attrs["hwm_column"] = column
+        df.attrs["hwm"] = _hwm_of(df[column]) if column in df else None
+        logger.info(f'{db}: {len(df)} rows past {column} = {hwm}')
+        return df
+    return fetch
+
+def upsert_table(connection):
+    """Writer merging delta frames into `os_<table>` with INSERT ... ON CONFLICT (id).
+
+    The delta is loaded into a staging table with COPY, merged, and the table's new
+    high-water mark is saved, all in one transaction. On a table's first
+    incremental run `os_<table>` is replaced with the full frame, including
+    its `id` column, and given a primary key on `id`. If the table has lost
+    that key (replaced by a full-mode run), its mark is reset and an error
+    raised: the delta cannot be merged, the next run reloads the table.
+    """
+    def write(db: str, df):
+        if df.empty:
+            return
+        table = f'os_{db.lower()}'
+        staging = f'{table}__staging'
+        with _begin(connection):
+            exists = inspect(connection).has_table(table)
+            lost_key = exists and not df.attrs.get("full") and not _has_id_key(connection, table)
+            if lost_key:
+                _delete_mark(connection, db)
+        if lost_key:
+            raise RuntimeError(f'{table} has no primary key on "id" (replaced by a full sync?): '
+                               'its high-water mark was reset, the next incremental run reloads it in full')
+        with _begin(connection):
+            if df.attrs.get("full") or not exists:
+                create_like(connection, df, table)
+                copy_frame(connection, df, table)
+                connection.execute(text(f'ALTER TABLE {table} ADD PRIMARY KEY ("id")'))
+            else:
+                create_like(connection, df, staging)
+                copy_frame(connection, df, staging)
+                cols = ", ".join(quote_ident(connection, c) for c in df.columns)
+                updates = ", ".join(
+                    f"{quote_ident(connection, c)} = EXCLUDED.{quote_ident(connection, c)}" for c in df.columns if c != "id"
+                )
+                connection.execute(text(
+                    f'INSERT INTO {table} ({cols}) SELECT {cols} FROM {staging} ON CONFLICT ("id") DO '
+                    + (f"UPDATE SET {updates}" if updates else "NOTHING")
+                ))
+                connection.execute(text(f"DROP TABLE {staging}"))
+            if df.attrs.get("hwm") is not None:
+                connection.execute(text(
+                    f"INSERT INTO {STATE_TABLE} (table_name, hwm_column, hwm) VALUES (:t, :c, :h) "
+                    "ON CONFLICT (table_name) DO UPDATE SET hwm_column = EXCLUDED.hwm_column, "
+                    "hwm = EXCLUDED.hwm, updated_at = now()"
+                ), {"t": db, "c": df.attrs["hwm_column"], "h": df.attrs["hwm"]})
+    return write
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from coercion import parse_bools, parse_numbers
+
+def test_parse_numbers_french_format():
+    out = parse_numbers(pd.Series(["1 234,5", "-", "12"]))
+    assert out.tolist() == [1234.5, 0.0, 12.0]
+    assert out.dtype == "Float64"
+
+def test_parse_numbers_keeps_missing_values():
+    out = parse_numbers(pd.Series(["5", None, np.nan, "", "abc"], dtype=object))
+    assert out.iloc[0] == 5.0
+    assert out.iloc[1:].isna().all()
+
+def test_parse_bools():
+    out = parse_bools(pd.Series(["0", "1", "2", "", None], dtype=object))
+    assert out.tolist()[:3] == [False, True, True]
+    assert out.iloc[3:].isna().all()
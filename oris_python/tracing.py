@@ -0,0 +1,210 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+_enabled = False
+_keep_events = True
+_sink = None     # open JSON lines file span events are streamed to
+_lock = threading.Lock()
+_events = []     # finished spans (dicts), in completion order (only when kept)
+_spans = {}      # (name, labels) -> [count, total seconds]
+_counters = {}   # (name, labels) -> value
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+class Span:
+    """Timed section; `set()` attaches attributes (rows, bytes...) to its event."""
+    __slots__ = ("name", "labels", "detail", "attrs", "_start", "_wall")
+
+    def __init__(self, name: str, labels: tuple, detail):
+        self.name, self.labels, self.detail, self.attrs = name, labels, detail, {}
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        seconds = time.perf_counter() - self._start
+        event = {"type": "span", "name": self.name, "start": self._wall, "seconds": seconds}
+        if self.labels:
+            event["labels"] = dict(self.labels)
+        if self.detail is not None:
+            event["detail"] = self.detail
+        if self.attrs:
+            event["attrs"] = self.attrs
+        if exc_type is not None:
+            event["error"] = exc_type.__name__
+        with _lock:
+            if _sink is not None:
+                _sink.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            elif _keep_events:
+                _events.append(event)
+            agg = _spans.setdefault((self.name, self.labels), [0, 0.0])
+            agg[0] += 1
+            agg[1] += seconds
+        return False
+
+def enabled():
+    return _enabled
+
+def enable(keep_events: bool = True):
+    """Turn tracing on. With `keep_events=False` only the aggregates (span
+    totals, counters) are kept, so memory stays flat in long-running processes."""
+    global _enabled, _keep_events
+    _enabled = True
+    _keep_events = keep_events
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def reset():
+    with _lock:
+        _events.clear()
+        _spans.clear()
+        _counters.clear()
+
+def span(name: str, detail=None, **labels):
+    """Time a `with` block. `labels` are aggregated (keep them low-cardinality),
+    `detail` (e.g. a file name) only goes to the JSON lines event.
+
+    When tracing is disabled this returns a shared no-op object.
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, tuple(sorted(labels.items())), detail)
+
+def count(name: str, value=1, **labels):
+    """Add `value` to the counter `name` (no-op when tracing is disabled)."""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+# ─── export ──────────────────────────────────────────────────────────────────
+
+def events():
+    """Finished spans (if kept in memory) then counter totals, as JSON-serializable dicts."""
+    with _lock:
+        out = list(_events)
+        out += [
+            dict({"type": "counter", "name": name, "value": value}, **({"labels": dict(labels)} if labels else {}))
+            for (name, labels), value in sorted(_counters.items())
+        ]
+    return out
+
+def write_jsonl(path):
+    """Append every event to `path`, one JSON object per line."""
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events():
+            f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+def stream_events(path):
+    """Append each span event to `path` as it finishes instead of keeping it
+    in memory; `close_stream()` adds the counter totals and closes the file."""
+    global _sink
+    with _lock:
+        _sink = open(path, "a", encoding="utf-8")
+
+def close_stream():
+    global _sink
+    with _lock:
+        sink, _sink = _sink, None
+    if sink is not None:
+        for event in events():
+            if event["type"] == "counter":
+                sink.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        sink.close()
+
+def _before_fork():
+    _lock.acquire()
+    if _sink is not None:
+        _sink.flush()
+
+def _after_fork_in_child():
+    """A forked process (e.g. a ProcessPoolExecutor worker) does not trace into
+    the parent's stream: concurrent writes to the shared file would interleave
+    and lose events. Its buffer was flushed before the fork, so dropping the
+    file object writes nothing."""
+    global _enabled, _sink
+    if _sink is not None:
+        _enabled, _sink = False, None
+    _lock.release()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_before_fork, after_in_parent=_lock.release, after_in_child=_after_fork_in_child)
+
+def _metric(name: str):
+    return "oris_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+def prometheus_text():
+    """Current aggregates in the Prometheus text exposition format.
+
+    Spans become `oris_<name>_seconds_sum` / `_count`, counters `oris_<name>_total`.
+    """
+    lines, seen = [], set()
+    with _lock:
+        spans = sorted(_spans.items())
+        counters = sorted(_counters.items())
+    for (name, labels), (n, total) in spans:
+        metric = _metric(name) + "_seconds"
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_sum{_labels(labels)} {total:.6f}")
+        lines.append(f"{metric}_count{_labels(labels)} {n}")
+    for (name, labels), value in counters:
+        metric = _metric(name) + "_total"
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path):
+    """Write `prometheus_text()` atomically (for the node_exporter textfile collector)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+def configure_from_env():
+    """Enable tracing when ORIS_TRACE (JSON lines file) or ORIS_TRACE_PROM (Prometheus
+    textfile) is set. Span events are streamed to the JSON lines file and never
+    kept in memory; counter totals and the Prometheus file are written when the
+    process exits."""
+    jsonl, prom = os.getenv("ORIS_TRACE"), os.getenv("ORIS_TRACE_PROM")
+    if not (jsonl or prom):
+        return
+    enable(keep_events=False)
+    if jsonl:
+        stream_events(jsonl)
+        atexit.register(close_stream)
+    if prom:
+        atexit.register(write_prometheus, prom)
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from analyze_oris import analyze, levels, parse_oris
+
+INI = "doc_reflex/1_data/bd/agents_gestion.ini"
+READ = f'fsdk_read(\n{INI}\n,1;2\n,="json=true&fils0==&fil0=\'id\'"\n)'
+WRITE = f'fsdk_write(\n{INI}\n,1;2\n,="json=true&mch1=test&fils0==&fil0=\'id\'"\n)'
+
+def _analyze(tmp_path: Path, text: str):
+    path = tmp_path / "chain.oris"
+    path.write_text(text, encoding="utf-8")
+    return analyze(path, {})
+
+def test_read_after_write_waits_for_it(tmp_path):
+    steps = parse_oris(f"={WRITE}\n&\n{READ}")
+    assert steps[1].depends == {0}
+    assert [[s.index for s in lvl] for lvl in levels(steps)] == [[0], [1]]
+    assert _analyze(tmp_path, f"={WRITE}\n&\n{READ}")["parallel_levels"] == []
+
+def test_write_waits_for_earlier_reads(tmp_path):
+    steps = parse_oris(f"={READ}\n&\n{READ}\n&\n{WRITE}")
+    assert steps[2].depends == {0, 1}
+
+def test_reads_separated_by_a_write_are_not_mergeable(tmp_path):
+    res = _analyze(tmp_path, f"={READ}\n&\n{WRITE}\n&\n{READ}")
+    assert res["mergeable_reads"] == []
+    res = _analyze(tmp_path, f"={READ}\n&\n{READ}\n&\n{WRITE}")
+    assert [m["steps"] for m in res["mergeable_reads"]] == [[0, 1]]
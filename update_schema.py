@@ -6,8 +6,22 @@ Met à jour le fichier schema.json à partir des fichiers .ini du dossier bd/.
 - La clé de chaque table = valeur de 'titre' dans la section [PARAM].
 - Le chemin utilisé = "doc_reflex/1_data/bd/<nom_fichier>.ini".
 - Les champs = toutes les valeurs ‘*_name’ de la section [CHAMPS] (dans l’ordre).
+- "field_meta" = type (‘*_type’) et liste (‘*_liste’) de chaque champ.
+- "version" = empreinte courte de l’entrée : change si et seulement si la
+  table change, les reconstructions en aval peuvent s’y fier.
+
+Incrémental :
+- un cache (.schema_cache.json) garde l’empreinte de chaque .ini et l’entrée
+  qui en a été extraite ; seuls les .ini modifiés sont relus
+- le cache garde aussi l’empreinte de l’analyseur (ce fichier) : toute
+  modification de l’extraction invalide le cache et tous les .ini sont relus
+- schema.json n’est réécrit que si son contenu change (mtime préservé sinon)
+- l’ordre des tables existantes est conservé, les nouvelles sont ajoutées à la fin
+- --force ignore le cache
 """
 
+import argparse
+import hashlib
 import json
 import re
 from pathlib import Path
@@ -23,16 +37,24 @@ SCHEMA_JSON = Path("schema.json")
 # Préfixe fixe du chemin à écrire dans le JSON
 PATH_PREFIX = "doc_reflex/1_data/bd/"
 
+# Cache des .ini déjà analysés
+SCHEMA_CACHE = Path(".schema_cache.json")
+
+# Empreinte de l’analyseur : un changement de code rend le cache périmé
+PARSER = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
+
 # -----------------------------------------------------------------------------
 
 
-def extract_table_info(ini_path: Path) -> tuple[str, list[str]]:
-    """Extrait (titre, [liste_champs]) depuis un fichier .ini."""
+def extract_table_info(ini_path: Path, text: str = None) -> tuple[str, list[str], dict]:
+    """Extrait (titre, [liste_champs], {champ: {type, liste}}) depuis un fichier .ini."""
     titre = None
     champs: list[str] = []
+    attrs: dict[int, dict] = {}
 
-    with ini_path.open(encoding="utf-8") as f:
-        lines = f.readlines()
+    if text is None:
+        text = ini_path.read_text(encoding="utf-8")
+    lines = text.replace("\r\n", "\n").splitlines(keepends=True)
 
     # Trouver le titre
     for line in lines:
@@ -52,32 +74,90 @@ def extract_table_info(ini_path: Path) -> tuple[str, list[str]]:
         m = re.match(r"\s*\d+_name\s*=\s*(.+)", line)
         if m:
             champs.append(m.group(1).strip())
+        m = re.match(r"\s*(\d+)_(name|type|liste)\s*=\s*(.*)", line)
+        if m:
+            attrs.setdefault(int(m.group(1)), {})[m.group(2)] = m.group(3).strip()
 
     if not titre:
         raise ValueError(f"Champ 'titre' manquant dans {ini_path}")
 
-    return titre, champs
-
-
-def main() -> None:
-    # On vide le contenu précédent → on repart toujours de zéro
-    schema = {}
-
-    # Parcourir tous les .ini
-    for ini_file in BD_DIR.glob("*.ini"):
-        titre, champs = extract_table_info(ini_file)
-        schema[titre] = {
-            "path": f"{PATH_PREFIX}{ini_file.name}",
-            "fields": champs,
-        }
-        print(f"✓ {titre} ({ini_file.name}) ajouté·e – {len(champs)} champs")
-
-    # Sauvegarder en écrasant le fichier (vide + réécriture complète)
-    with SCHEMA_JSON.open("w", encoding="utf-8") as f:
-        json.dump(schema, f, indent=4, ensure_ascii=False)
-
-    print(f"\n✅ schema.json réécrit ({len(schema)} table(s)).")
+    meta = {}
+    for _, a in sorted(attrs.items()):
+        if "name" in a:
+            meta[a["name"]] = {k: a[k] for k in ("type", "liste") if a.get(k)}
+    return titre, champs, meta
+
+
+def table_entry(ini_file: Path, text: str) -> tuple[str, dict]:
+    """(titre, entrée schema.json) d’un .ini, version comprise."""
+    titre, champs, meta = extract_table_info(ini_file, text)
+    entry = {
+        "path": f"{PATH_PREFIX}{ini_file.name}",
+        "fields": champs,
+        "field_meta": meta,
+    }
+    digest = hashlib.sha256(json.dumps(entry, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    entry["version"] = digest.hexdigest()[:12]
+    return titre, entry
+
+
+def load_json(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}  # fichier illisible → reconstruction complète
+
+
+def main(force: bool = False) -> list[str]:
+    """Met schema.json à jour ; renvoie les tables ajoutées, modifiées ou supprimées."""
+    cached = {} if force else load_json(SCHEMA_CACHE)
+    cache = cached.get("files", {}) if cached.get("parser") == PARSER else {}
+    previous = load_json(SCHEMA_JSON)
+    new_cache, tables = {}, {}
+    parsed = 0
+
+    # Parcourir tous les .ini (seuls ceux dont l’empreinte a changé sont relus)
+    for ini_file in sorted(BD_DIR.glob("*.ini")):
+        raw = ini_file.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        hit = cache.get(ini_file.name)
+        if hit and hit["hash"] == digest:
+            titre, entry = hit["titre"], hit["entry"]
+        else:
+            titre, entry = table_entry(ini_file, raw.decode("utf-8"))
+            parsed += 1
+        if titre in tables:
+            raise ValueError(f"Titre « {titre} » en double ({ini_file.name})")
+        tables[titre] = entry
+        new_cache[ini_file.name] = {"hash": digest, "titre": titre, "entry": entry}
+
+    # Ordre existant conservé, nouvelles tables à la fin
+    schema = {t: tables[t] for t in previous if t in tables}
+    schema.update((t, e) for t, e in tables.items() if t not in schema)
+
+    changed = sorted(t for t in schema.keys() | previous.keys() if schema.get(t) != previous.get(t))
+    for t in changed:
+        if t not in previous:
+            print(f"✓ {t} ajouté·e – {len(schema[t]['fields'])} champs")
+        elif t not in schema:
+            print(f"🗑  {t} supprimé·e")
+        else:
+            print(f"✓ {t} modifié·e (version {schema[t]['version']})")
+
+    text = json.dumps(schema, indent=4, ensure_ascii=False)
+    if not SCHEMA_JSON.exists() or SCHEMA_JSON.read_text(encoding="utf-8") != text:
+        SCHEMA_JSON.write_text(text, encoding="utf-8")
+        print(f"\n✅ schema.json mis à jour ({len(schema)} table(s), {parsed} .ini relu(s)).")
+    else:
+        print(f"\n✅ schema.json inchangé ({len(schema)} table(s), {parsed} .ini relu(s)).")
+
+    SCHEMA_CACHE.write_text(json.dumps({"parser": PARSER, "files": new_cache}, indent=2, ensure_ascii=False), encoding="utf-8")
+    return changed
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Met à jour schema.json depuis bd/*.ini")
+    parser.add_argument("--force", action="store_true", help="relit tous les .ini (ignore le cache)")
+    main(force=parser.parse_args().force)
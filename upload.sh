@@ -1,3 +1,3 @@
 #!/bin/bash
 
-python3 ftp.py
\ No newline at end of file
+python3 ftp.py --delta
\ No newline at end of file
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Mode surveillance : recompile et déploie à chaque modification.
+
+Surveille (par scrutation des mtimes, sans dépendance) :
+  • bd/*.ini            → update_schema.py (incrémental, seules les tables
+                          modifiées changent de « version »)
+  • format/**/*.json    → create_scripts.py --incremental (seuls les .oris
+                          dont la source ou les tables ont changé)
+Une rafale de modifications (enregistrement multiple, checkout…) est
+regroupée : la reconstruction part quand plus rien ne bouge pendant
+--debounce secondes.
+
+Après chaque reconstruction, sdk/ est synchronisé comme par ftp.py --delta
+(même manifeste, mis à jour fichier par fichier) sur une seule session FTP
+gardée ouverte entre deux modifications (NOOP périodique, reconnexion
+automatique en cas de coupure). Ce qui est envoyé découle donc du manifeste
+et non de la seule dernière compilation : un envoi interrompu est repris à
+la modification suivante, et la synchronisation initiale envoie tout ce qui
+diffère du dernier envoi, même si sdk/ était déjà à jour localement.
+
+Exemple :
+    python watch.py                 # Ctrl+C pour arrêter
+    python watch.py --no-upload     # compilation seule
+"""
+
+import argparse, os, time
+from ftplib import error_perm, error_reply, error_temp
+
+import create_scripts
+import ftp
+import update_schema
+from create_scripts import FORMAT_DIR, ROOT_DIR, SDK_DIR
+
+BD_DIR = ROOT_DIR / "bd"
+NETWORK_ERRORS = (error_temp, error_reply, OSError, EOFError)
+
+# ───────────────────────────── scrutation ────────────────────────────────────
+def snapshot() -> dict:
+    """{fichier: (mtime_ns, taille)} des entrées surveillées."""
+    files = {}
+    for root, pattern in ((BD_DIR, "*.ini"), (FORMAT_DIR, "**/*.json")):
+        for path in root.glob(pattern):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue  # supprimé entre glob et stat
+            files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+def wait_for_changes(state: dict, interval: float, debounce: float, idle=None):
+    """Attend une modification puis la fin de la rafale ; renvoie (nouvel état, fichiers changés)."""
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        if current != state:
+            break
+        if idle:
+            idle()
+    while True:
+        time.sleep(debounce)
+        settled = snapshot()
+        if settled == current:
+            break
+        current = settled
+    changed = {p for p in current.keys() | state.keys() if current.get(p) != state.get(p)}
+    return current, changed
+
+# ───────────────────────────── déploiement ───────────────────────────────────
+class Deployer:
+    """Session FTP persistante : envoie / supprime des .oris de sdk/."""
+
+    def __init__(self, connect=ftp.open_session, keepalive: float = 60):
+        self.connect = connect
+        self.keepalive_every = keepalive
+        self.session = None
+        self.known_dirs = set()
+        self.last_used = time.monotonic()
+        self.target = f"{ftp.HOST}:{ftp.PORT}{ftp.REMOTE_DIR}"
+
+    def close(self):
+        if self.session is not None:
+            try:
+                self.session.quit()
+            except (error_perm, *NETWORK_ERRORS):
+                self.session.close()
+            self.session = None
+
+    def _call(self, action):
+        """Exécute `action(session)`, avec une reconnexion si la session est tombée."""
+        for attempt in range(2):
+            if self.session is None:
+                self.session = self.connect()
+            try:
+                result = action(self.session)
+                self.last_used = time.monotonic()
+                return result
+            except NETWORK_ERRORS:
+                try:
+                    self.session.close()
+                except OSError:
+                    pass
+                self.session = None
+                if attempt:
+                    raise
+
+    def keepalive(self):
+        """NOOP sur une session inactive, pour qu’elle ne soit pas fermée côté serveur."""
+        if self.session is None or time.monotonic() - self.last_used < self.keepalive_every:
+            return
+        try:
+            self._call(lambda s: s.voidcmd("NOOP"))
+        except NETWORK_ERRORS:
+            pass  # on se reconnectera au prochain envoi
+
+    def sync(self) -> dict:
+        """Envoie les .oris nouveaux/modifiés et efface ceux supprimés, d’après le
+        manifeste de ftp.py --delta (enregistré même en cas d’interruption)."""
+        manifest = ftp.load_manifest(self.target)
+        try:
+            return self._call(lambda s: ftp.sync_directory(str(SDK_DIR), ftp.REMOTE_DIR, s, manifest,
+                                                           known_dirs=self.known_dirs))
+        finally:
+            ftp.save_manifest(self.target, manifest)
+
+# ───────────────────────────── reconstruction ────────────────────────────────
+def rebuild(changed, deployer: Deployer = None):
+    start = time.perf_counter()
+    try:
+        if any(p.suffix == ".ini" for p in changed):
+            tables = update_schema.main()
+            if tables:
+                print(f"Tables modifiées : {', '.join(tables)}")
+        create_scripts.main(incremental=True)
+        if deployer:
+            stats = deployer.sync()
+            if stats["sent"] or stats["deleted"]:
+                print(f"FTP : {stats['sent']} envoyé(s), {stats['deleted']} supprimé(s)")
+    except (error_perm, *NETWORK_ERRORS) as e:
+        print(f"[FTP] Envoi interrompu : {e} (réessai à la prochaine modification)")
+    except Exception as e:
+        print(f"⚠️  Reconstruction impossible : {e}")
+    print(f"⏱  {time.perf_counter() - start:.2f} s\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompile et déploie les .oris à chaque modification")
+    parser.add_argument("--interval", type=float, default=0.2, help="période de scrutation (s)")
+    parser.add_argument("--debounce", type=float, default=0.3, help="calme requis avant reconstruction (s)")
+    parser.add_argument("--keepalive", type=float, default=60, help="NOOP après N s d’inactivité")
+    parser.add_argument("--no-upload", action="store_true", help="compile sans envoyer sur le FTP")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR)  # update_schema.py et ftp.py travaillent en chemins relatifs
+    deployer = None if args.no_upload else Deployer(keepalive=args.keepalive)
+    state = snapshot()
+    print("Synchronisation initiale…")
+    rebuild({p for p in state if p.suffix == ".ini"}, deployer)
+    print(f"Surveillance de {BD_DIR} et {FORMAT_DIR} (Ctrl+C pour arrêter)…")
+    try:
+        while True:
+            state, changed = wait_for_changes(state, args.interval, args.debounce,
+                                              deployer.keepalive if deployer else None)
+            print(f"{len(changed)} fichier(s) modifié(s) : "
+                  + ", ".join(sorted(p.name for p in changed)[:5]) + ("…" if len(changed) > 5 else ""))
+            rebuild(changed, deployer)
+    except KeyboardInterrupt:
+        print("Arrêt.")
+    finally:
+        if deployer:
+            deployer.close()
+
+if __name__ == "__main__":
+    main()